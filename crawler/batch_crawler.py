@@ -0,0 +1,199 @@
+# batch_crawler.py
+# -*- coding: utf-8 -*-
+# 多账号批量导出：一个进程为整个班级同步课表
+#
+# ✅ 从账号文件读取学号与密码
+# ✅ 有界线程池同时处理多个账号，每个账号独立的 session、登录态缓存与输出目录
+# ✅ 所有账号共享同一个验证码识别服务与按主机限速器，不会因账号多而压垮教务系统
+# ✅ 结束时汇总成功 / 失败账号数与登录、导出耗时
+#
+# 账号文件格式（UTF-8，每行一个账号，# 开头为注释）：
+#   2024001,password1
+#   2024002,password2
+#
+# 用法：
+#   python batch_crawler.py accounts.csv --workers 8 --json batch_report.json
+
+import argparse
+import csv
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import jw_client
+import parse_course_all_week as crawler
+from captcha_solvers import INTERACTIVE_SOLVERS, get_solver
+
+ACCOUNT_WORKERS = 8          # 同时处理的账号数
+EXPORTS_PER_ACCOUNT = 2      # 每个账号同时进行的导出请求数
+OUT_ROOT = "extracted_courses"
+USERNAME_RE = re.compile(r"^\w+$")  # 学号同时用作输出目录名与登录态缓存文件名
+
+
+# ================= 账号 =================
+def load_accounts(path):
+    """返回 [(学号, 密码), ...]，重复的学号只保留第一次出现"""
+    accounts = []
+    seen = set()
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            username = row[0].strip()
+            password = row[1].strip() if len(row) > 1 else ""
+            if not USERNAME_RE.match(username):
+                print(f"⚠️ 账号 {username!r} 含有字母、数字、下划线以外的字符，已忽略")
+                continue
+            if username in seen:
+                print(f"⚠️ 账号 {username} 重复，已忽略")
+                continue
+            seen.add(username)
+            accounts.append((username, password))
+    return accounts
+
+
+# ================= 单个账号 =================
+def run_account(username, password, terms=None, weeks=crawler.EXPORT_WEEKS, out_root=OUT_ROOT,
+                max_workers=EXPORTS_PER_ACCOUNT, limiter=None):
+    """登录并导出一个账号的课表，返回该账号的统计结果"""
+    result = {"account": username, "ok": False, "login_seconds": 0.0, "export_seconds": 0.0,
+              "failed_weeks": [], "error": None}
+    if not USERNAME_RE.match(username):
+        result["error"] = "学号只能包含字母、数字和下划线"
+        return result
+
+    started = time.perf_counter()
+    try:
+        # 多个账号同时登录：登录请求同样经过共享限速器，且不写共用的 debug 登录页
+        session = jw_client.get_session(username, password, limiter=limiter, debug_page=None)
+    except Exception as e:
+        session = None
+        result["error"] = f"登录异常: {e}"
+    result["login_seconds"] = time.perf_counter() - started
+    if session is None:
+        result["error"] = result["error"] or "登录失败"
+        return result
+
+    started = time.perf_counter()
+    try:
+        failed = crawler.export_course_xls(
+            session,
+            terms=terms,
+            weeks=weeks,
+            max_workers=max_workers,
+            out_root=Path(out_root) / username,
+            login=lambda: jw_client.login_fresh(username, password, limiter=limiter, debug_page=None),
+            limiter=limiter,
+        )
+    except Exception as e:
+        failed = None
+        result["error"] = f"导出异常: {e}"
+    result["export_seconds"] = time.perf_counter() - started
+
+    if failed is not None:
+        result["failed_weeks"] = [f"{term}:{week}" for term, week in failed]
+        result["ok"] = not failed
+        if failed:
+            result["error"] = f"{len(failed)} 周未导出成功"
+    return result
+
+
+# ================= 批量 =================
+def run_batch(accounts, workers=ACCOUNT_WORKERS, rate_limit=crawler.EXPORT_RATE_LIMIT, **options):
+    """
+    有界线程池处理全部账号；rate_limit 是所有账号合计的每秒请求上限
+    返回 (每个账号的结果列表, 汇总统计)
+    需要人工输入验证码的识别方案（tesseract）会被拒绝：多个线程同时 input() 无法对应到账号
+    """
+    if jw_client.CAPTCHA_SOLVER in INTERACTIVE_SOLVERS:
+        raise ValueError(f"批量导出不支持需要人工输入验证码的识别方案: {jw_client.CAPTCHA_SOLVER}（请使用 ddddocr）")
+    limiter = jw_client.HostRateLimiter(rate_limit)
+    get_solver(jw_client.CAPTCHA_SOLVER)  # 所有账号共用一个识别服务，提前在后台加载模型
+
+    results = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_account, u, p, limiter=limiter, **options): u for u, p in accounts}
+        for done, fut in enumerate(as_completed(futures), 1):
+            result = fut.result()
+            results.append(result)
+            mark = "✅" if result["ok"] else "❌"
+            print(f"{mark} [{done}/{len(accounts)}] {result['account']}"
+                  f"（登录 {result['login_seconds']:.1f}s，导出 {result['export_seconds']:.1f}s）"
+                  + (f": {result['error']}" if result["error"] else ""))
+
+    results.sort(key=lambda r: r["account"])
+    return results, summarize(results, time.perf_counter() - started)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))]
+
+
+def summarize(results, elapsed):
+    login = [r["login_seconds"] for r in results]
+    export = [r["export_seconds"] for r in results if r["export_seconds"]]
+    return {
+        "accounts": len(results),
+        "succeeded": sum(r["ok"] for r in results),
+        "failed": sum(not r["ok"] for r in results),
+        "failed_accounts": [r["account"] for r in results if not r["ok"]],
+        "elapsed_seconds": elapsed,
+        "accounts_per_minute": len(results) / elapsed * 60 if elapsed else 0.0,
+        "login_p50_seconds": percentile(login, 50),
+        "login_p95_seconds": percentile(login, 95),
+        "export_p50_seconds": percentile(export, 50),
+        "export_p95_seconds": percentile(export, 95),
+    }
+
+
+def print_summary(summary):
+    print("=" * 40)
+    print(f"🎉 批量导出完成：{summary['succeeded']}/{summary['accounts']} 个账号成功，"
+          f"总耗时 {summary['elapsed_seconds']:.1f}s（{summary['accounts_per_minute']:.1f} 个/分钟）")
+    print(f"   登录耗时 p50 {summary['login_p50_seconds']:.1f}s / p95 {summary['login_p95_seconds']:.1f}s")
+    print(f"   导出耗时 p50 {summary['export_p50_seconds']:.1f}s / p95 {summary['export_p95_seconds']:.1f}s")
+    if summary["failed_accounts"]:
+        print(f"❌ 失败账号: {', '.join(summary['failed_accounts'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多账号批量导出课表")
+    parser.add_argument("accounts", help="账号文件（每行 学号,密码）")
+    parser.add_argument("--workers", type=int, default=ACCOUNT_WORKERS, help="同时处理的账号数")
+    parser.add_argument("--exports-per-account", type=int, default=EXPORTS_PER_ACCOUNT,
+                        help="每个账号同时进行的导出请求数")
+    parser.add_argument("--rate-limit", type=float, default=crawler.EXPORT_RATE_LIMIT,
+                        help="所有账号合计每秒最多请求数（0 = 不限速）")
+    parser.add_argument("--terms", nargs="+", default=crawler.EXPORT_TERMS, help="需要导出的学期")
+    parser.add_argument("--out", default=OUT_ROOT, help="输出根目录（每个账号一个子目录）")
+    parser.add_argument("--json", help="把每个账号的结果与汇总写入 JSON 文件")
+    args = parser.parse_args()
+    if jw_client.CAPTCHA_SOLVER in INTERACTIVE_SOLVERS:
+        raise SystemExit(f"❌ 批量导出不支持 JW_CAPTCHA_SOLVER={jw_client.CAPTCHA_SOLVER}（需要人工输入验证码），请使用 ddddocr")
+
+    accounts = load_accounts(args.accounts)
+    if not accounts:
+        raise SystemExit("❌ 账号文件中没有账号")
+    print(f"📂 已加载 {len(accounts)} 个账号")
+
+    results, summary = run_batch(
+        accounts,
+        workers=args.workers,
+        rate_limit=args.rate_limit,
+        terms=args.terms,
+        out_root=args.out,
+        max_workers=args.exports_per_account,
+    )
+    print_summary(summary)
+
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps({"summary": summary, "accounts": results}, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print("完成：已生成", args.json)
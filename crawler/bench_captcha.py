@@ -0,0 +1,206 @@
+# bench_captcha.py
+# -*- coding: utf-8 -*-
+# 验证码识别离线评估：在本地已标注的验证码库上比较不同识别方案
+#
+# 语料目录结构：
+#   corpus/
+#     labels.csv      # 每行: 文件名,正确验证码（人工标注，唯一可靠的标注来源）
+#     xxx.png ...
+# 直接评估 captcha_archive 归档目录时可用 --label-from-name：
+# 只使用状态为 login（用该结果登录成功）的文件，取文件名中的验证码作为标注；
+# 其余状态的文件名只是识别器自己的输出，用来评估等于拿识别结果给自己打分，一律跳过
+#
+# 用法：
+#   python bench_captcha.py corpus/ --recognizers tesseract ddddocr ddddocr-constrained
+#   python bench_captcha.py corpus/ --json bench_result.json
+#
+# 指标：准确率、单张延迟 p50/p95、单核吞吐（张/CPU 秒）、每次成功登录预计需要的验证码数
+
+import argparse
+import csv
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from captcha_preprocess import preprocess_for_ocr, to_image
+
+TESSERACT_CONFIG = "--psm 7 -c tessedit_char_whitelist=0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+DEFAULT_CHARSET = "0123456789abcdefghjklmnopqrstuvwxyz"
+CAPTCHA_LENGTH = 4
+
+
+# ================= 语料 =================
+def load_corpus(directory, label_from_name=False):
+    """返回 [(文件名, 图片字节, 标注), ...]"""
+    directory = Path(directory)
+    labels = {}
+
+    labels_csv = directory / "labels.csv"
+    if labels_csv.exists():
+        with open(labels_csv, encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[0] and not row[0].startswith("#"):
+                    labels[row[0].strip()] = row[1].strip()
+
+    corpus = []
+    skipped = 0
+    for path in sorted(directory.glob("*.png")) + sorted(directory.glob("*.jpg")):
+        label = labels.get(path.name)
+        if label is None and label_from_name:
+            label = label_from_archive_name(path.stem)
+            skipped += label is None
+        if label:
+            corpus.append((path.name, path.read_bytes(), label))
+    if skipped:
+        print(f"⏭ 跳过 {skipped} 张未经登录验证的归档验证码（只使用 login 状态的文件）")
+    return corpus
+
+
+def label_from_archive_name(stem):
+    """captcha_<时间>_login_<验证码> → 验证码；其他状态或 none 返回 None"""
+    parts = stem.rsplit("_", 2)
+    if len(parts) != 3 or parts[1] != "login" or parts[2] in ("", "none"):
+        return None
+    return parts[2]
+
+
+# ================= 识别方案 =================
+def make_tesseract():
+    import pytesseract
+
+    def recognize(image: bytes) -> str:
+        img = to_image(preprocess_for_ocr([image], threshold=140, border=5)[0])
+        text = pytesseract.image_to_string(img, config=TESSERACT_CONFIG)
+        return "".join(ch for ch in text.strip() if ch.isalnum())
+
+    return recognize
+
+
+def make_ddddocr(constrained=False, charset=DEFAULT_CHARSET):
+    from captcha_service import get_service
+
+    service = get_service()
+    service.wait_ready()  # 模型加载时间不计入单张延迟
+
+    def recognize(image: bytes) -> str:
+        if not constrained:
+            text, _ = service.recognize(image)[0]
+            text = "".join(c for c in text.lower() if c.isalnum())
+            return text[:CAPTCHA_LENGTH]
+
+        candidates = service.recognize(image, top_k=5, alphabet=charset, aliases={"i": "l"})
+        for text, _ in candidates:
+            if len(text) == CAPTCHA_LENGTH:
+                return text
+        return ""
+
+    return recognize
+
+
+RECOGNIZERS = {
+    "tesseract": make_tesseract,
+    "ddddocr": make_ddddocr,
+    "ddddocr-constrained": lambda: make_ddddocr(constrained=True),
+}
+
+
+# ================= 评估 =================
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def cpu_time():
+    """本进程与已结束子进程的 CPU 时间之和（pytesseract 每次识别都会启动 tesseract 子进程）"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def run_benchmark(recognize, corpus, case_sensitive=False):
+    latencies = []
+    correct = 0
+    empty = 0
+    failures = []
+
+    cpu_started = cpu_time()
+    for name, image, label in corpus:
+        started = time.perf_counter()
+        try:
+            text = recognize(image)
+        except Exception as e:
+            text = ""
+            print(f"⚠️ {name} 识别异常: {e}")
+        latencies.append(time.perf_counter() - started)
+
+        if not text:
+            empty += 1
+        ok = text == label if case_sensitive else text.lower() == label.lower()
+        if ok:
+            correct += 1
+        else:
+            failures.append({"file": name, "label": label, "result": text})
+    cpu_seconds = cpu_time() - cpu_started
+
+    n = len(corpus)
+    accuracy = correct / n if n else 0.0
+    return {
+        "samples": n,
+        "accuracy": accuracy,
+        "empty_rate": empty / n if n else 0.0,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p95_ms": percentile(latencies, 95) * 1000,
+        "latency_mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        # 推理线程与识别子进程的 CPU 时间都计入，各方案按同一口径比较 "每核每秒张数"
+        "throughput_per_core": n / cpu_seconds if cpu_seconds > 0 else 0.0,
+        # 每次登录尝试只用一张验证码，成功率为 accuracy 的几何分布期望；准确率为 0 时为 None（JSON 中为 null）
+        "expected_captchas_per_login": 1 / accuracy if accuracy else None,
+        "failures": failures,
+    }
+
+
+def print_report(results):
+    header = f"{'方案':<22}{'样本':>6}{'准确率':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'张/核·秒':>11}{'次/成功登录':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        expected = "∞" if r["expected_captchas_per_login"] is None else f"{r['expected_captchas_per_login']:.2f}"
+        print(
+            f"{name:<22}{r['samples']:>6}{r['accuracy']:>9.1%}"
+            f"{r['latency_p50_ms']:>10.1f}{r['latency_p95_ms']:>10.1f}"
+            f"{r['throughput_per_core']:>11.1f}{expected:>12}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="验证码识别离线评估")
+    parser.add_argument("corpus", help="已标注的验证码目录")
+    parser.add_argument("--recognizers", nargs="+", default=list(RECOGNIZERS), choices=list(RECOGNIZERS))
+    parser.add_argument("--label-from-name", action="store_true",
+                        help="从 captcha_archive 文件名读取标注（只使用登录成功的 login 状态文件）")
+    parser.add_argument("--case-sensitive", action="store_true", help="区分大小写比较")
+    parser.add_argument("--json", help="把完整结果（含识别错误列表）写入 JSON 文件")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.label_from_name)
+    if not corpus:
+        raise SystemExit("❌ 语料目录中没有已标注的验证码")
+    print(f"📂 已加载 {len(corpus)} 张已标注验证码")
+
+    results = {}
+    for name in args.recognizers:
+        try:
+            recognize = RECOGNIZERS[name]()
+        except Exception as e:
+            print(f"⚠️ 跳过 {name}（初始化失败: {e}）")
+            continue
+        results[name] = run_benchmark(recognize, corpus, args.case_sensitive)
+
+    print_report(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print("完成：已生成", args.json)
@@ -0,0 +1,104 @@
+# captcha_archive.py
+# -*- coding: utf-8 -*-
+# 验证码归档（可选）
+#
+# 登录流程只在内存中处理验证码，默认不落盘。
+# 需要收集样本（调试 / 准确率评估）时再开启：
+#   CAPTCHA_ARCHIVE_FAILURES=1   保存识别失败的验证码
+#   CAPTCHA_ARCHIVE_SAMPLE=20    另外随机保存约 1/20 的验证码
+# 目录大小有上限，超出后删除最旧的文件
+#
+# 文件名：captcha_<时间>_<状态>_<OCR 结果或 none>.png，状态：
+#   fail      OCR 结果被放弃（未识别出 / 置信度过低），没有提交
+#   ok        OCR 结果已提交，登录结果未知
+#   login     用该结果登录成功 → 文件名中的验证码可以作为标注
+#   rejected  用该结果登录失败（验证码或密码错误）
+
+import os
+import random
+import threading
+from datetime import datetime
+from pathlib import Path
+
+ARCHIVE_DIR = Path(__file__).parent / "captcha_image_library"
+ARCHIVE_FAILURES = os.environ.get("CAPTCHA_ARCHIVE_FAILURES") == "1"
+ARCHIVE_SAMPLE_EVERY = int(os.environ.get("CAPTCHA_ARCHIVE_SAMPLE") or 0)  # 0 = 不抽样
+ARCHIVE_MAX_FILES = 500
+ARCHIVE_MAX_BYTES = 20 * 1024 * 1024
+
+
+class CaptchaArchive:
+    def __init__(self, directory=ARCHIVE_DIR, keep_failures=ARCHIVE_FAILURES,
+                 sample_every=ARCHIVE_SAMPLE_EVERY, max_files=ARCHIVE_MAX_FILES,
+                 max_bytes=ARCHIVE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.keep_failures = keep_failures
+        self.sample_every = sample_every
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._submitted = threading.local()  # 当前线程最近一张已提交的验证码
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_failures or self.sample_every > 0
+
+    def _should_keep(self, failed: bool) -> bool:
+        if failed and self.keep_failures:
+            return True
+        # 按概率抽样：每次运行只登录一两次，进程内计数无法做到 "每 N 张存 1 张"
+        return self.sample_every > 0 and random.random() < 1.0 / self.sample_every
+
+    def offer(self, image: bytes, label: str = "", failed: bool = False):
+        """
+        提交一张验证码，按配置决定是否保存；返回保存路径或 None
+        label: OCR 结果（未经人工确认，仅作参考）
+        """
+        if not self.enabled or not self._should_keep(failed):
+            return None
+
+        status = "fail" if failed else "ok"
+        name = f"captcha_{datetime.now():%Y%m%d_%H%M%S_%f}_{status}_{label or 'none'}.png"
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / name
+            path.write_bytes(image)
+            self._rotate()
+        if not failed:
+            self._submitted.path = path
+        return path
+
+    def record_login(self, succeeded: bool):
+        """
+        登录结束后调用：把当前线程最近提交的验证码状态由 ok 改为 login / rejected
+        只有 login 状态的文件名标注经过了教务系统验证
+        """
+        path = getattr(self._submitted, "path", None)
+        self._submitted.path = None
+        if path is None:
+            return None
+        prefix, _, label = path.stem.rsplit("_", 2)
+        target = path.with_name(f"{prefix}_{'login' if succeeded else 'rejected'}_{label}{path.suffix}")
+        try:
+            path.rename(target)
+        except OSError:
+            return None  # 已被轮转删除
+        return target
+
+    def _rotate(self):
+        files = sorted(self.directory.glob("captcha_*.png"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        while files and (len(files) > self.max_files or total > self.max_bytes):
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+
+
+_archive = None
+
+
+def get_archive() -> CaptchaArchive:
+    global _archive
+    if _archive is None:
+        _archive = CaptchaArchive()
+    return _archive
@@ -0,0 +1,72 @@
+# captcha_preprocess.py
+# -*- coding: utf-8 -*-
+# 验证码预处理（NumPy 向量化版，供 Tesseract 识别路径共用）
+#
+# 所有函数都作用在 (N, H, W) 的 uint8 灰度图堆栈上，
+# 一次调用即可处理一批验证码（例如离线评估整个验证码库）
+
+import io
+
+import numpy as np
+from PIL import Image
+
+WHITE = 255
+
+
+def load_gray(images) -> np.ndarray:
+    """
+    把一批图片（bytes / PIL.Image / ndarray）转成 (N, H, W) 灰度堆栈
+    尺寸不一致时在右侧、下方用白色补齐
+    """
+    arrays = []
+    for img in images:
+        if isinstance(img, (bytes, bytearray)):
+            img = Image.open(io.BytesIO(img))
+        if isinstance(img, Image.Image):
+            img = np.asarray(img.convert("L"))
+        arrays.append(np.asarray(img, dtype=np.uint8))
+
+    h = max(a.shape[0] for a in arrays)
+    w = max(a.shape[1] for a in arrays)
+    stack = np.full((len(arrays), h, w), WHITE, dtype=np.uint8)
+    for i, a in enumerate(arrays):
+        stack[i, :a.shape[0], :a.shape[1]] = a
+    return stack
+
+
+def invert(stack: np.ndarray) -> np.ndarray:
+    return WHITE - stack
+
+
+def binarize(stack: np.ndarray, threshold: int) -> np.ndarray:
+    """大于阈值 → 255，否则 → 0（等价于 img.point(lambda x: 255 if x > t else 0)）"""
+    return np.where(stack > threshold, WHITE, 0).astype(np.uint8)
+
+
+def pad(stack: np.ndarray, border: int, fill: int = WHITE) -> np.ndarray:
+    """四周各扩展 border 像素（等价于 ImageOps.expand）"""
+    return np.pad(stack, ((0, 0), (border, border), (border, border)), constant_values=fill)
+
+
+def median3(stack: np.ndarray) -> np.ndarray:
+    """3×3 中值滤波去噪（等价于 ImageFilter.MedianFilter(3)，边缘按复制像素处理）"""
+    padded = np.pad(stack, ((0, 0), (1, 1), (1, 1)), mode="edge")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (3, 3), axis=(1, 2))
+    windows = windows.reshape(*stack.shape, 9)
+    return np.partition(windows, 4, axis=-1)[..., 4]
+
+
+# ================= 预设流程 =================
+def preprocess_for_ocr(images, threshold=140, border=5) -> np.ndarray:
+    """recognize_captcha 使用的流程：灰度 → 二值化 → 白边扩展 → 中值滤波"""
+    return median3(pad(binarize(load_gray(images), threshold), border))
+
+
+def preprocess_inverted(images, threshold=150) -> np.ndarray:
+    """反色流程：灰度 → 反色 → 中值滤波 → 二值化"""
+    return binarize(median3(invert(load_gray(images))), threshold)
+
+
+def to_image(array: np.ndarray) -> Image.Image:
+    """单张结果转回 PIL.Image（pytesseract 的输入）"""
+    return Image.fromarray(np.ascontiguousarray(array, dtype=np.uint8))  # 2 维 uint8 → "L" 模式
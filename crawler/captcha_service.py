@@ -0,0 +1,217 @@
+# captcha_service.py
+# -*- coding: utf-8 -*-
+# 常驻验证码识别服务（ddddocr）
+#
+# ✅ ONNX 模型在后台线程中只加载一次，之后所有登录共用
+# ✅ 直接接收内存中的图片字节，不经过磁盘
+# ✅ 并发请求进入同一队列，由推理线程成批取出处理
+# ✅ 返回 top-k 候选及其概率（CTC prefix beam search）
+# ✅ 可限定字符集、合并易混字符（如 i → l），在本地纠正识别结果
+
+import heapq
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+BATCH_SIZE = 8        # 推理线程一次最多取出的请求数
+BATCH_WAIT = 0.005    # 收到第一个请求后，再等待多久以凑成一批（秒）
+
+
+# ================= CTC 解码 =================
+def _normalize_char(ch: str, aliases) -> str:
+    ch = ch.lower()
+    return aliases.get(ch, ch)
+
+
+def collapse_columns(probs, charsets, alphabet, aliases=None):
+    """
+    把模型的完整字符表压缩到已知字符集：
+    - 大小写合并，aliases 中的易混字符并入目标字符（例如 {"i": "l"}）
+    - 字符集之外的列直接丢弃（其概率不再计入任何候选，置信度随之降低）
+    返回 (新的逐帧概率, 新的列字符表)，第 0 列为 blank
+    """
+    aliases = aliases or {}
+    index = {c: i + 1 for i, c in enumerate(alphabet)}
+    mapping = []
+    for src, ch in enumerate(charsets):
+        dst = 0 if ch == "" else index.get(_normalize_char(ch, aliases))
+        if dst is not None:
+            mapping.append((src, dst))
+
+    collapsed = []
+    for frame in probs:
+        row = [0.0] * (len(alphabet) + 1)
+        for src, dst in mapping:
+            row[dst] += frame[src]
+        collapsed.append(row)
+    return collapsed, [""] + list(alphabet)
+
+
+def decode_topk(probs, labels, k=1, beam_width=10, prune=5):
+    """
+    CTC prefix beam search
+    probs:  每一帧在各输出列上的概率 [[p0, p1, ...], ...]
+    labels: 各列对应的字符，"" 表示 blank
+    返回按概率从高到低排列的 [(text, probability), ...]
+    """
+    blank = {i for i, label in enumerate(labels) if label == ""}
+    beams = {(): (1.0, 0.0)}  # prefix -> (以 blank 结尾的概率, 以字符结尾的概率)
+
+    for frame in probs:
+        top = heapq.nlargest(prune, range(len(frame)), key=frame.__getitem__)
+        nxt = defaultdict(lambda: [0.0, 0.0])
+
+        for prefix, (p_b, p_nb) in beams.items():
+            for c in top:
+                p = frame[c]
+                if c in blank:
+                    nxt[prefix][0] += (p_b + p_nb) * p
+                    continue
+
+                label = labels[c]
+                extended = prefix + (label,)
+                if prefix and prefix[-1] == label:
+                    # 相同字符连续出现：中间有 blank 才算新字符，否则与前一个合并
+                    nxt[extended][1] += p_b * p
+                    nxt[prefix][1] += p_nb * p
+                else:
+                    nxt[extended][1] += (p_b + p_nb) * p
+
+        ranked = sorted(nxt.items(), key=lambda kv: kv[1][0] + kv[1][1], reverse=True)
+        beams = {prefix: tuple(p) for prefix, p in ranked[:beam_width]}
+
+    ranked = sorted(beams.items(), key=lambda kv: kv[1][0] + kv[1][1], reverse=True)
+    return [("".join(prefix), p_b + p_nb) for prefix, (p_b, p_nb) in ranked[:k]]
+
+
+# ================= 识别服务 =================
+class CaptchaService:
+    """
+    进程内常驻识别服务：一个推理线程 + 请求队列
+    """
+
+    def __init__(self, beta=True, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT):
+        self.beta = beta
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ocr = None
+        self._ready = threading.Event()
+        self._load_error = None
+
+    def start(self):
+        """
+        启动推理线程（非阻塞）：模型在后台加载，
+        调用方可以同时去请求登录页 / scode，加载完成前提交的请求会排队等待
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="captcha-service", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def wait_ready(self, timeout=None) -> bool:
+        self.start()
+        return self._ready.wait(timeout)
+
+    def submit(self, image: bytes, top_k: int = 1, alphabet=None, aliases=None) -> Future:
+        self.start()
+        fut = Future()
+        self._queue.put((image, (top_k, alphabet, aliases), fut))
+        return fut
+
+    def recognize(self, image: bytes, top_k: int = 1, alphabet=None, aliases=None, timeout=None):
+        """
+        识别一张验证码，返回 [(text, probability), ...]（最多 top_k 个）
+        alphabet: 限定输出字符集（同时按小写处理）；aliases: 易混字符映射
+        """
+        return self.submit(image, top_k, alphabet, aliases).result(timeout)
+
+    # ---------- 推理线程 ----------
+    def _load(self):
+        import ddddocr  # 模型较大，只在服务启动时导入
+
+        started = time.perf_counter()
+        self._ocr = ddddocr.DdddOcr(show_ad=False, beta=self.beta)
+        print(f"✅ ddddocr 模型已加载（{time.perf_counter() - started:.2f}s）")
+
+    def _classify(self, image: bytes, top_k: int, alphabet=None, aliases=None):
+        try:
+            result = self._ocr.classification(image, probability=True)
+        except TypeError:
+            # 旧版本 ddddocr 不支持 probability 参数，只能返回单个结果
+            text = self._ocr.classification(image)
+            if alphabet:
+                text = "".join(c for c in (_normalize_char(ch, aliases or {}) for ch in text) if c in alphabet)
+            return [(text, 1.0)]
+
+        probs, labels = result["probability"], result["charsets"]
+        if probs and not isinstance(probs[0], list):
+            probs = [probs]  # 只有一帧时会被 squeeze 成一维
+        if alphabet:
+            probs, labels = collapse_columns(probs, labels, alphabet, aliases)
+        return decode_topk(probs, labels, k=top_k)
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(0.0, remaining)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # 处理完这一批再退出
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        try:
+            self._load()
+        except Exception as e:
+            self._load_error = e
+        self._ready.set()
+
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            for image, options, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                if self._load_error is not None:
+                    fut.set_exception(self._load_error)
+                    continue
+                try:
+                    fut.set_result(self._classify(image, *options))
+                except Exception as e:
+                    fut.set_exception(e)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> CaptchaService:
+    """进程内共享的识别服务（首次调用时启动并在后台加载模型）"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CaptchaService().start()
+        return _service
@@ -0,0 +1,171 @@
+# captcha_solvers.py
+# -*- coding: utf-8 -*-
+# 验证码获取与识别方案（登录时由 jw_client 按名称选择）
+#
+# "ddddocr"   ✅ 常驻识别服务，限定字符集、i 按 l 处理，置信度不足才重新获取，最多 10 次，不需要人工
+# "tesseract" ✅ NumPy 预处理 + Tesseract，识别不稳定时打开图片请人工输入
+#
+# 两种方案都只在内存中处理验证码，是否归档由 captcha_archive 配置决定；
+# 重量级依赖（ddddocr 模型、pytesseract、NumPy、PIL）都在首次识别时才导入
+
+import os
+import time
+
+from captcha_archive import get_archive
+from jw_client import CAPTCHA_URL, COMMON_HEADERS
+
+# ---------------- ddddocr 配置 ----------------
+CAPTCHA_LENGTH = 4
+CAPTCHA_CHARSET = "0123456789abcdefghjklmnopqrstuvwxyz"  # 实际验证码中不会出现 i
+CAPTCHA_ALIASES = {"i": "l"}    # ddddocr 常把 l 识别为 i，直接把 i 的概率并入 l
+CAPTCHA_TOP_K = 5
+CAPTCHA_MIN_CONFIDENCE = 0.4    # 最佳 4 位结果的概率低于该值才重新获取验证码
+CAPTCHA_MAX_RETRY = 10
+
+# ---------------- Tesseract 配置 ----------------
+TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"  # 如果已加入环境变量，可留空
+TESSERACT_CONFIG = "--psm 7 -c tessedit_char_whitelist=0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def fetch_captcha(session) -> bytes:
+    r = session.get(CAPTCHA_URL + "?t=" + str(int(time.time() * 1000)), headers=COMMON_HEADERS, timeout=15)
+    r.raise_for_status()
+    return r.content
+
+
+# ================= ddddocr =================
+def recognize_captcha_dddocr(image: bytes):
+    """
+    使用 ddddocr 识别验证码（直接传入图片字节）
+    - 输出限定在 CAPTCHA_CHARSET 内，大小写合并，i 的概率并入 l
+    - 在 top-k 候选中取概率最高的 CAPTCHA_LENGTH 位结果
+    返回 (验证码, 置信度)，没有合适候选时返回 ("", 0.0)
+    """
+    from captcha_service import get_service
+
+    try:
+        candidates = get_service().recognize(
+            image,
+            top_k=CAPTCHA_TOP_K,
+            alphabet=CAPTCHA_CHARSET,
+            aliases=CAPTCHA_ALIASES,
+        )
+    except Exception as e:
+        print(f"🤖 ddddocr 识别异常: {e}")
+        return "", 0.0
+
+    for code, confidence in candidates:
+        if len(code) == CAPTCHA_LENGTH:
+            print(f"🤖 ddddocr 识别验证码: {code}（置信度 {confidence:.2f}）")
+            return code, confidence
+    return "", 0.0
+
+def solve_with_ddddocr(session, max_retry=CAPTCHA_MAX_RETRY) -> str:
+    """
+    验证码获取与识别（最终策略）：
+    - 只使用 ddddocr
+    - 先在本地用字符概率纠正结果，置信度不足时才重新获取
+    - 最多尝试 max_retry 次
+    """
+    archive = get_archive()
+
+    for attempt in range(1, max_retry + 1):
+        image = fetch_captcha(session)
+        print(f"🖼 获取验证码 ({attempt}/{max_retry})")
+
+        code, confidence = recognize_captcha_dddocr(image)
+
+        if not code:
+            print("⚠️ ddddocr 未识别出 4 位结果，重新获取验证码")
+            archive.offer(image, failed=True)
+            continue
+
+        if confidence < CAPTCHA_MIN_CONFIDENCE:
+            print(f"♻️ 置信度过低（{confidence:.2f} < {CAPTCHA_MIN_CONFIDENCE}）：{code}，重新获取验证码")
+            archive.offer(image, code, failed=True)
+            continue
+
+        print(f"✅ 使用验证码: {code}")
+        archive.offer(image, code)
+        return code
+
+    raise RuntimeError(f"❌ 连续 {max_retry} 次验证码识别失败（ddddocr）")
+
+
+# ================= Tesseract =================
+def preprocess_image(image: bytes):
+    """对验证码图片进行预处理，提高 OCR 识别率（灰度 → 反色 → 中值滤波 → 二值化）"""
+    from captcha_preprocess import preprocess_inverted, to_image
+
+    return to_image(preprocess_inverted([image], threshold=150)[0])
+
+def recognize_captcha(image: bytes) -> str:
+    """对验证码图片（内存中的字节）进行预处理并使用OCR识别"""
+    try:
+        import pytesseract
+        from captcha_preprocess import preprocess_for_ocr, to_image
+
+        if TESSERACT_PATH and os.path.exists(TESSERACT_PATH):
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+
+        # 灰度 → 二值化（去背景）→ 白边扩展 → 中值滤波去噪（向量化实现，见 captcha_preprocess.py）
+        img = to_image(preprocess_for_ocr([image], threshold=140, border=5)[0])
+        text = pytesseract.image_to_string(img, config=TESSERACT_CONFIG)
+
+        # 清洗输出结果
+        text = "".join(ch for ch in text.strip() if ch.isalnum())
+        if len(text) < 4:  # 验证码一般为4位
+            raise ValueError("识别结果过短")
+        print(f"🤖 OCR 识别验证码: {text}")
+        return text
+    except Exception as e:
+        print(f"🤖 OCR 识别验证码: [识别失败]（{e}）")
+        return ""
+
+def ask_user(image: bytes) -> str:
+    """打开验证码图片请人工输入（只有这时才把图片写到临时文件）"""
+    import tempfile
+    import webbrowser
+
+    with tempfile.NamedTemporaryFile(prefix="captcha_", suffix=".png", delete=False) as f:
+        f.write(image)
+    try:
+        webbrowser.open("file://" + f.name)
+    except Exception:
+        pass
+    try:
+        return input("请输入验证码（区分大小写）：").strip()
+    finally:
+        os.unlink(f.name)
+
+def solve_with_tesseract(session) -> str:
+    """下载验证码 -> OCR 识别，识别不稳定时人工输入"""
+    image = fetch_captcha(session)
+    print("🖼 已获取验证码")
+
+    captcha_text = recognize_captcha(image)
+    if not captcha_text or len(captcha_text) < 4:
+        get_archive().offer(image, captcha_text, failed=True)
+        print("⚠️ OCR 识别不稳定，请人工输入:")
+        return ask_user(image)
+
+    get_archive().offer(image, captcha_text)
+    return captcha_text
+
+
+# ================= 选择 =================
+SOLVERS = {
+    "ddddocr": solve_with_ddddocr,
+    "tesseract": solve_with_tesseract,
+}
+INTERACTIVE_SOLVERS = {"tesseract"}  # 识别失败时会调用 input() 请人工输入，不能用于批量 / 多线程登录
+
+def get_solver(name="ddddocr"):
+    """按名称返回识别函数；ddddocr 会立即在后台开始加载模型"""
+    if name not in SOLVERS:
+        raise ValueError(f"未知的验证码识别方案: {name}（可选 {', '.join(SOLVERS)}）")
+    if name == "ddddocr":
+        from captcha_service import get_service
+
+        get_service()
+    return SOLVERS[name]
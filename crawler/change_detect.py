@@ -0,0 +1,195 @@
+# change_detect.py
+# -*- coding: utf-8 -*-
+# 周课表导出的变化检测
+#
+# ✅ 服务器提供 ETag / Last-Modified 时发送条件请求，304 直接判定为未变化（不下载正文）
+# ✅ 否则对解析后的课表内容做规范化哈希，与上次结果比较（导出时间戳等无关差异不算变化）
+# ✅ 内容未变化时不覆盖本地文件，下游的增量解析缓存保持有效
+# ✅ 每次导出生成逐周 changed / unchanged 报告，供 JSON 转换与企业微信推送判断是否需要运行
+# ✅ 报告为每个下游（convert / notify）分别记录待处理的周：新导出只会追加，
+#    下游处理完后才确认清除；两次导出之间没有运行下游时变化也不会丢失
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from export_job import atomic_write_bytes
+
+STATE_NAME = ".fetch_state.json"      # 每周的 ETag / Last-Modified / 内容哈希
+REPORT_NAME = ".change_report.json"   # 最近一次导出的逐周变化报告 + 各下游待处理的周
+CONSUMERS = ("convert", "notify")     # 读取报告的下游，各自维护待处理的周
+LOCK_TIMEOUT = 10.0                   # 秒；报告由导出与多个下游进程读改写，写入前加锁
+LOCK_STALE = 30.0                     # 秒；超过该时间的锁文件视为进程异常退出后遗留
+
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+
+def content_fingerprint(data: bytes) -> str:
+    """
+    规范化内容哈希：能解析的导出按课表单元格计算，解析失败时退回原始字节哈希
+    """
+    try:
+        from convert_xls_to_json import read_schedule_data  # 只有需要比较内容时才导入 xlrd
+
+        rows = read_schedule_data(data)
+        normalized = json.dumps(
+            [(section, [str(cell).strip() for cell in cells]) for section, cells in rows],
+            ensure_ascii=False,
+        ).encode("utf-8")
+        return "rows:" + hashlib.sha256(normalized).hexdigest()
+    except Exception:
+        return "raw:" + hashlib.sha256(data).hexdigest()
+
+
+class ChangeTracker:
+    """
+    一个输出目录（一个学期）对应一个 tracker，可在多个导出线程间共享
+    - conditional_headers(week) → 条件请求头
+    - remember(week, response)  → 暂存响应中的校验头（文件落盘后才生效）
+    - is_changed(week, content) → 与上次记录的内容哈希比较
+    - commit(week, content)     → 文件处理完后记录校验头与内容哈希
+    - save(term, changes, failed) → 保存状态并写出变化报告
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = Path(out_dir)
+        self.state_path = self.out_dir / STATE_NAME
+        self.report_path = self.out_dir / REPORT_NAME
+        self._lock = threading.Lock()
+        self._pending = {}
+        try:
+            self.state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.state = {}
+
+    def week_path(self, week) -> Path:
+        return self.out_dir / f"courses_week_{week:02}.xls"
+
+    def conditional_headers(self, week) -> dict:
+        entry = self.state.get(str(week))
+        if not entry or not self.week_path(week).exists():
+            return {}  # 本地文件缺失时必须重新下载正文
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def remember(self, week, response):
+        with self._lock:
+            self._pending[str(week)] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+
+    def is_changed(self, week, content: bytes) -> bool:
+        digest = content_fingerprint(content)
+        with self._lock:
+            self._pending.setdefault(str(week), {})["hash"] = digest
+            entry = self.state.get(str(week))
+        return not (entry and entry.get("hash") == digest and self.week_path(week).exists())
+
+    def commit(self, week, content: bytes):
+        with self._lock:
+            entry = self._pending.pop(str(week), {})
+            if "hash" not in entry:
+                entry["hash"] = content_fingerprint(content)
+            self.state[str(week)] = entry
+
+    def save(self, term, changes, failed=()):
+        """保存校验头与内容哈希，写出本次导出的变化报告，并把变化的周并入各下游的待处理列表"""
+        results = dict(changes)
+        results.update({week: FAILED for week in failed})
+        weeks = {str(w): r for w, r in sorted(results.items())}
+        # 失败的周也列入 changed：下游宁可多处理一次，也不能漏掉变化
+        changed = sorted(w for w, r in results.items() if r != UNCHANGED)
+        with self._lock:
+            atomic_write_bytes(self.state_path, json.dumps(self.state, ensure_ascii=False, indent=2).encode("utf-8"))
+            with report_lock(self.report_path):
+                previous = load_report(self.out_dir) or {}
+                pending = previous.get("pending", {})
+                report = {
+                    "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "term": term,
+                    "weeks": weeks,
+                    "changed": changed,
+                    "pending": {
+                        c: sorted(set(pending.get(c, [])) | {str(w) for w in changed}, key=int) for c in CONSUMERS
+                    },
+                }
+                atomic_write_bytes(self.report_path, json.dumps(report, ensure_ascii=False, indent=2).encode("utf-8"))
+
+        counts = {r: list(weeks.values()).count(r) for r in (CHANGED, UNCHANGED, FAILED)}
+        print(f"🔍 变化检测：变化 {counts[CHANGED]} 周，未变化 {counts[UNCHANGED]} 周，失败 {counts[FAILED]} 周")
+        return report
+
+
+@contextmanager
+def report_lock(report_path, timeout=LOCK_TIMEOUT, stale=LOCK_STALE):
+    """
+    报告文件的跨进程锁（锁文件用 O_EXCL 创建，Windows / Linux 通用）
+    notifier/send_wecom_file.py 用同样的锁文件确认已推送的周
+    """
+    lock = Path(str(report_path) + ".lock")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > stale:
+                    lock.unlink(missing_ok=True)  # 持锁进程已退出
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"等待 {lock} 超时")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        lock.unlink(missing_ok=True)
+
+
+def load_report(directory):
+    """读取目录下最近一次的变化报告；不存在时返回 None（下游按全部变化处理）"""
+    try:
+        return json.loads((Path(directory) / REPORT_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def pending_weeks(directory, consumer):
+    """
+    该下游尚未处理的变化周次集合（字符串 "7"）；没有报告时返回 None（按全部变化处理）
+    旧格式报告没有 pending 时退回到最近一次导出的 changed
+    """
+    report = load_report(directory)
+    if report is None:
+        return None
+    if "pending" not in report:
+        return {str(w) for w in report.get("changed", [])}
+    return set(report["pending"].get(consumer, []))
+
+
+def ack_weeks(directory, consumer, weeks):
+    """下游处理完这些周后调用，从其待处理列表中清除（其他下游不受影响）"""
+    path = Path(directory) / REPORT_NAME
+    weeks = {str(int(w)) for w in weeks}
+    with report_lock(path):
+        report = load_report(directory)
+        if not report or "pending" not in report:
+            return
+        remaining = [w for w in report["pending"].get(consumer, []) if w not in weeks]
+        if remaining == report["pending"].get(consumer, []):
+            return
+        report["pending"][consumer] = remaining
+        atomic_write_bytes(path, json.dumps(report, ensure_ascii=False, indent=2).encode("utf-8"))
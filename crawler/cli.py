@@ -0,0 +1,243 @@
+# cli.py
+# -*- coding: utf-8 -*-
+# 课表爬虫统一命令行入口
+#
+#   python cli.py this-week              导出当前周（自动推算周次）
+#   python cli.py week 5                 导出第 5 周；python cli.py week all 导出全部周次（一个文件）
+#   python cli.py all                    并发导出 1~21 周（断点续传 + 变化检测）
+#   python cli.py convert                解析 extracted_courses/ 生成 all_weeks_courses.json
+#   python cli.py publish                发布带内容哈希与 gzip/brotli 预压缩的数据文件
+#   python cli.py ics                    生成 iCalendar 订阅源（--accounts 为批量导出的每个账号生成）
+#   python cli.py serve                  启动本地课表查询服务（/today /next /week/N /room/X）
+#   python cli.py batch accounts.csv     多账号批量导出
+#
+# 通用参数：--ocr ddddocr|tesseract 选择验证码识别方案（batch 只支持 ddddocr），--username / --password 覆盖环境变量
+#
+# 启动时只导入 argparse；requests、xlrd、openpyxl、OCR 模型等都在对应子命令真正用到时才导入，
+# 因此 convert 或复用缓存登录态的导出几乎没有启动开销
+
+import argparse
+import os
+
+
+# ================= 公共 =================
+def login(args):
+    import jw_client
+
+    username = args.username or jw_client.USERNAME
+    if not username:
+        raise SystemExit("❌ 请通过 --username 或环境变量 JW_USERNAME / JW_PASSWORD 提供登录凭证")
+    password = args.password if args.password is not None else jw_client.PASSWORD
+    session = jw_client.get_session(username, password, solver=args.ocr)
+    if not session:
+        raise SystemExit("❌ 登录失败")
+    return session, username, password
+
+
+def week_arg(value):
+    """argparse 类型：all 或 EXPORT_WEEKS 范围内的周次，all 返回 ""（导出全部周次）"""
+    from parse_course_all_week import parse_week
+
+    try:
+        return parse_week(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def maybe_xlsx(args, xls_path):
+    if not args.xlsx or not xls_path:
+        return
+    from convert_xls_to_xlsx import convert_xls_to_xlsx_clean
+
+    xlsx_path = convert_xls_to_xlsx_clean(xls_path)
+    print("转换后的文件：", xlsx_path)
+
+
+# ================= 子命令 =================
+def cmd_this_week(args):
+    from jw_client import export_week, get_current_week
+
+    session, _, _ = login(args)
+    week = get_current_week()
+    print(f"📅 自动识别当前为第 {week} 周")
+    xls_path = export_week(session, week, args.term, args.out)
+    if not xls_path:
+        raise SystemExit("❌ 导出失败，没有导出文件")
+    maybe_xlsx(args, xls_path)
+
+
+def cmd_week(args):
+    from jw_client import export_week
+
+    session, _, _ = login(args)
+    xls_path = export_week(session, args.week, args.term, args.out)
+    if not xls_path:
+        raise SystemExit("❌ 导出失败，没有导出文件")
+    maybe_xlsx(args, xls_path)
+
+
+def cmd_all(args):
+    import jw_client
+    import parse_course_all_week as crawler
+
+    session, username, password = login(args)
+    if args.mode == "single":
+        if not crawler.export_all_weeks_single(session, term=args.terms[0] if args.terms else None,
+                                               out_root=args.out):
+            raise SystemExit(1)
+        return
+
+    failed = crawler.export_course_xls(
+        session,
+        terms=args.terms,
+        weeks=range(args.first, args.last + 1),
+        max_workers=args.workers,
+        rate_limit=args.rate_limit,
+        detect_changes=not args.no_detect_changes,
+        out_root=args.out,
+        login=lambda: jw_client.login_fresh(username, password, args.ocr),
+    )
+    if failed:
+        raise SystemExit(1)
+
+
+def cmd_convert(args):
+    import convert_xls_to_json as converter
+
+    if args.all_weeks_file:
+        converter.parse_all_weeks(args.all_weeks_file)
+    else:
+        converter.parse_all(args.dir, use_cache=not args.no_cache, workers=args.workers,
+                            changed_only=args.changed_only)
+    if args.publish:
+        cmd_publish(args)
+
+
+def cmd_publish(args):
+    from publish_artifacts import DIST_DIR, publish
+
+    if publish(getattr(args, "dist", None) or DIST_DIR) is None:
+        raise SystemExit(1)
+
+
+def cmd_ics(args):
+    import ics_export
+
+    if args.accounts:
+        ics_export.export_accounts(args.accounts, args.out, args.state, args.workers)
+    else:
+        ics_export.export_from_json(args.json, args.out, args.state)
+
+
+def cmd_serve(args):
+    from query_api import serve
+
+    serve(args.host, args.port, path=args.data, fallback=args.json)
+
+
+def cmd_batch(args):
+    import batch_crawler
+    import jw_client
+
+    if args.ocr in batch_crawler.INTERACTIVE_SOLVERS:
+        raise SystemExit(f"❌ 批量导出不支持 --ocr {args.ocr}（识别失败时需要人工输入验证码），请使用 ddddocr")
+    jw_client.CAPTCHA_SOLVER = args.ocr  # 批量登录使用同一种识别方案
+    accounts = batch_crawler.load_accounts(args.accounts)
+    if not accounts:
+        raise SystemExit("❌ 账号文件中没有账号")
+    print(f"📂 已加载 {len(accounts)} 个账号")
+
+    results, summary = batch_crawler.run_batch(
+        accounts,
+        workers=args.workers,
+        rate_limit=args.rate_limit,
+        terms=args.terms,
+        out_root=args.out,
+        max_workers=args.exports_per_account,
+    )
+    batch_crawler.print_summary(summary)
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+# ================= 参数 =================
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="教务系统课表爬虫")
+    parser.add_argument("--ocr", choices=["ddddocr", "tesseract"],
+                        default=os.environ.get("JW_CAPTCHA_SOLVER", "ddddocr"), help="验证码识别方案")
+    parser.add_argument("--username", help="学号（默认读取 JW_USERNAME）")
+    parser.add_argument("--password", help="密码（默认读取 JW_PASSWORD）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("this-week", help="导出当前周课程表")
+    p.add_argument("--term", help="学期，例如 2025-2026-1")
+    p.add_argument("--out", default="extracted_courses", help="输出目录")
+    p.add_argument("--xlsx", action="store_true", help="同时生成适合手机查看的 xlsx")
+    p.set_defaults(func=cmd_this_week)
+
+    p = sub.add_parser("week", help="导出指定周课程表")
+    p.add_argument("week", type=week_arg, help="周次，或 all 表示一次导出全部周次")
+    p.add_argument("--term", help="学期，例如 2025-2026-1")
+    p.add_argument("--out", default="extracted_courses", help="输出目录")
+    p.add_argument("--xlsx", action="store_true", help="同时生成适合手机查看的 xlsx")
+    p.set_defaults(func=cmd_week)
+
+    p = sub.add_parser("all", help="并发导出全部周次（断点续传 + 变化检测）")
+    p.add_argument("--mode", choices=["weekly", "single"], default="weekly",
+                   help="weekly = 逐周导出；single = 一次请求导出全部周次")
+    p.add_argument("--terms", nargs="+", help="需要导出的学期（默认当前学期）")
+    p.add_argument("--first", type=int, default=1, help="起始周")
+    p.add_argument("--last", type=int, default=21, help="结束周")
+    p.add_argument("--workers", type=int, default=4, help="同时进行的导出请求数")
+    p.add_argument("--rate-limit", type=float, default=4.0, help="每秒最多请求数（0 = 不限速）")
+    p.add_argument("--no-detect-changes", action="store_true", help="不做变化检测，总是覆盖文件")
+    p.add_argument("--out", default="extracted_courses", help="输出目录")
+    p.set_defaults(func=cmd_all)
+
+    p = sub.add_parser("convert", help="解析导出文件生成 all_weeks_courses.json")
+    p.add_argument("all_weeks_file", nargs="?", help="全部周次导出文件（zc 为空导出）")
+    p.add_argument("--dir", default="extracted_courses", help="单周导出所在目录")
+    p.add_argument("--workers", type=int, default=1, help="并行解析进程数")
+    p.add_argument("--no-cache", action="store_true", help="忽略增量解析清单，全部重新解析")
+    p.add_argument("--changed-only", action="store_true", help="导出变化报告显示没有变化时跳过")
+    p.add_argument("--publish", action="store_true", help="解析后发布带哈希与预压缩的文件")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("publish", help="发布带内容哈希与预压缩的课表数据（dist/index.json）")
+    p.add_argument("--dist", help="前端 dist 目录（默认 ../frontend/dist）")
+    p.set_defaults(func=cmd_publish)
+
+    p = sub.add_parser("ics", help="生成 iCalendar 订阅源（全学期 + 每周）")
+    p.add_argument("--json", default="../frontend/dist/all_weeks_courses.json", help="all_weeks_courses.json 路径")
+    p.add_argument("--accounts", help="批量导出根目录：为其中每个账号子目录生成订阅源")
+    p.add_argument("--out", default="../frontend/dist/ics", help="订阅源输出目录")
+    p.add_argument("--state", default="extracted_courses/.ics_state.json", help="UID / SEQUENCE 状态文件")
+    p.add_argument("--workers", type=int, default=1, help="按账号解析时的并行进程数")
+    p.set_defaults(func=cmd_ics)
+
+    p = sub.add_parser("serve", help="启动本地课表查询服务")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--data", default="../frontend/dist/all_weeks_courses.compact.json", help="紧凑课表文件")
+    p.add_argument("--json", default="../frontend/dist/all_weeks_courses.json", help="紧凑文件不存在时使用的 JSON")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("batch", help="多账号批量导出")
+    p.add_argument("accounts", help="账号文件（每行 学号,密码）")
+    p.add_argument("--workers", type=int, default=8, help="同时处理的账号数")
+    p.add_argument("--exports-per-account", type=int, default=2, help="每个账号同时进行的导出请求数")
+    p.add_argument("--rate-limit", type=float, default=4.0, help="所有账号合计每秒最多请求数（0 = 不限速）")
+    p.add_argument("--terms", nargs="+", help="需要导出的学期（默认当前学期）")
+    p.add_argument("--out", default="extracted_courses", help="输出根目录（每个账号一个子目录）")
+    p.set_defaults(func=cmd_batch)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,48 @@
 import xlrd
+import hashlib
+import io
 import json
+import os
 import re
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 
+from change_detect import ack_weeks, pending_weeks
+from course_store import CourseStore
+from export_job import atomic_write_bytes
+from file_formats import (
+    FORMAT_DOC, FORMAT_HTML, FORMAT_LOGIN, FORMAT_XLS, FORMAT_XLSX,
+    read_html_tables, read_word_text, sniff_format, word_table_cells,
+)
+from publish_artifacts import INDEX_NAME, publish
+
 # ------------------ 配置 --------------------
 WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 # 设置学期开始日期
 TERM_START = datetime(2025, 9, 15, tzinfo=timezone(timedelta(hours=8))) # 第一周的周一
+TOTAL_WEEKS = 21
+
+OUT_PATH = Path("../frontend/dist/all_weeks_courses.json")
+COMPACT_OUT_PATH = Path("../frontend/dist/all_weeks_courses.compact.json")  # 列式紧凑格式，见 course_store.py
+
+# 按周分片：weeks/week_01.json … + weeks/manifest.json，前端先只加载当前周，其余周按需加载
+SHARD_DIR = Path("../frontend/dist/weeks")
+SHARD_MANIFEST_NAME = "manifest.json"
+SHARD_VERSION = 1
+SHARD_FILE_RE = re.compile(r"week_\d+\.json")
+
+# 增量解析清单：记录每个源文件的哈希与解析结果，未变化的周直接复用
+MANIFEST_NAME = ".parse_manifest.json"
+MANIFEST_VERSION = 1
+
+# 节次单元格，例如 "第一大节\n(01,02小节)\n08:20-09:55"
+SECTION_RE = re.compile(r"第.大节")
+
+# 周次行，例如 "2-3,5-16([周])"、"5([周])"、"1-15([单周])"
+WEEK_RANGE_RE = re.compile(r"^([\d,\-\s]+)\(\[?([单双])?周\]?\)")
 
 # ------------------ 自动解析单元格文本 ------------------
 def parse_cell_text(cell_text):
@@ -58,27 +92,146 @@ def get_date_for_week_and_day(week_num, weekday_index):
     delta_days = week_offset * 7 + weekday_index
     return (TERM_START + timedelta(days=delta_days)).strftime("%Y-%m-%d")
 
+# ------------------ 周次解析 --------------------
+def parse_week_ranges(text):
+    """
+    解析周次字符串，返回周次列表
+    "2-3,5-16([周])" → [2, 3, 5, 6, ..., 16]
+    "1-15([单周])"   → [1, 3, 5, ..., 15]
+    不是周次行时返回 None
+    """
+    m = WEEK_RANGE_RE.match(str(text).strip())
+    if not m:
+        return None
+
+    parity = m.group(2)
+    weeks = set()
+    for part in m.group(1).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            weeks.update(range(int(start), int(end) + 1))
+        else:
+            weeks.add(int(part))
+
+    if parity == "单":
+        weeks = {w for w in weeks if w % 2 == 1}
+    elif parity == "双":
+        weeks = {w for w in weeks if w % 2 == 0}
+    return sorted(weeks)
+
+
+def split_cell_courses(cell_text):
+    """
+    "全部周次" 导出中一个单元格可能包含多门课程，按周次行拆分成单门课程的文本块：
+    课程名 / 教师 / 周次 / 教室 —— 周次行前两行属于同一门课程
+    """
+    lines = [l.strip() for l in str(cell_text).split("\n") if l.strip()]
+    lines = [l for l in lines if not re.fullmatch(r"-{3,}", l)]  # 去掉分隔线
+
+    week_idx = [i for i, l in enumerate(lines) if parse_week_ranges(l) is not None]
+    if not week_idx:
+        return ["\n".join(lines)] if lines else []
+
+    starts = []
+    for i in week_idx:
+        prev_end = starts[-1] + 1 if starts else 0
+        starts.append(max(prev_end, i - 2))
+
+    blocks = []
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(lines)
+        blocks.append("\n".join(lines[start:end]))
+    return blocks
+
+
+def block_weeks(block):
+    """返回课程文本块中的周次列表，没有周次行时返回 None"""
+    for line in block.split("\n"):
+        weeks = parse_week_ranges(line)
+        if weeks is not None:
+            return weeks
+    return None
+
+# ------------------ 读取课表区域 --------------------
+def _section_rows(cells_by_row):
+    """
+    从任意来源的表格中挑出课表主体：首个单元格为 "第X大节" 的行，
+    返回 [(section, [周一单元格, ..., 周日单元格]), ...]
+    """
+    rows = []
+    for cells in cells_by_row:
+        if not cells or not SECTION_RE.search(str(cells[0])):
+            continue
+        section_raw = str(cells[0]).strip()
+        section_raw = section_raw[SECTION_RE.search(section_raw).start():]
+        section = re.sub(r"\s*\n\s*", " ", section_raw)
+        days = [str(c) for c in cells[1:8]]
+        rows.append((section, days + [""] * (7 - len(days))))
+    return rows
+
+
+def _word_rows(cells):
+    """Word 表格是按阅读顺序排列的单元格，以 "第X大节" 为行首重新切分"""
+    starts = [i for i, c in enumerate(cells) if SECTION_RE.search(c)]
+    return _section_rows(cells[i:i + 8] for i in starts)
+
+
+def read_schedule_rows(path):
+    """
+    读取课表主体：行 4-9 对应 section（index 从 3 开始），列 1–7 = 周一到周日
+    返回 [(section, [周一单元格, ..., 周日单元格]), ...]
+    先识别文件真实格式，再交给对应的读取器
+    """
+    return read_schedule_data(Path(path).read_bytes())
+
+def read_schedule_data(data: bytes):
+    """read_schedule_rows 的内存版本（例如直接检查刚下载的导出内容）"""
+    fmt = sniff_format(data)
+
+    if fmt == FORMAT_XLS:
+        book = xlrd.open_workbook(file_contents=data)
+        sheet = book.sheet_by_index(0)
+
+        rows = []
+        for row in range(3, 9):
+            section_raw = sheet.cell_value(row, 0).strip()
+            section = section_raw.replace("\n", " ")  # 简单处理
+            rows.append((section, [sheet.cell_value(row, col) for col in range(1, 8)]))
+        return rows
+
+    if fmt == FORMAT_DOC:
+        return _word_rows(word_table_cells(read_word_text(data)))
+
+    if fmt == FORMAT_HTML:
+        return _section_rows(row for table in read_html_tables(data) for row in table)
+
+    if fmt == FORMAT_XLSX:
+        import openpyxl  # 仅在遇到 xlsx 时才需要
+
+        wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        grid = [["" if v is None else v for v in row] for row in wb.worksheets[0].iter_rows(values_only=True)]
+        wb.close()
+        return _section_rows(grid)
+
+    if fmt == FORMAT_LOGIN:
+        raise ValueError("导出内容是登录页 HTML（导出时登录态已失效）")
+    raise ValueError("无法识别的导出文件格式")
+
 # ------------------ XLS 解析单周 --------------------
 def parse_one_xls(path, week_num):
-    book = xlrd.open_workbook(path)
-    sheet = book.sheet_by_index(0)
-
     courses = []
 
-    # 行 4-9 对应 section（index 从 3 开始）
-    for row in range(3, 9):
-        section_raw = sheet.cell_value(row, 0).strip()
-        section = section_raw.replace("\n", " ")  # 简单处理
-
+    for section, cells in read_schedule_rows(path):
         # 列 1–7 = 周一到周日
-        for col in range(1, 8):
-            weekday = WEEKDAYS[col - 1]
-            weekday_index = col - 1
+        for weekday_index, cell in enumerate(cells):
+            weekday = WEEKDAYS[weekday_index]
 
             # 生成该天的日期
             date_str = get_date_for_week_and_day(week_num, weekday_index)
 
-            cell = sheet.cell_value(row, col)
             if not cell or str(cell).strip() == "":
                 continue  # 无课程
 
@@ -96,24 +249,269 @@ def parse_one_xls(path, week_num):
 
     return courses
 
+# ------------------ 全部周次导出 → 按周展开 --------------------
+def expand_all_weeks_xls(path, total_weeks=TOTAL_WEEKS):
+    """
+    解析 zc 为空时导出的 "全部周次" 课表（1 次请求），
+    按单元格中的周次展开成与 parse_all 相同的 {"01": [...], ..., "21": [...]} 结构
+    """
+    results = {f"{w:02}": [] for w in range(1, total_weeks + 1)}
+
+    for section, cells in read_schedule_rows(path):
+        for weekday_index, cell in enumerate(cells):
+            for block in split_cell_courses(cell):
+                parsed = parse_cell_text(block)
+                if not parsed:
+                    continue
+
+                weeks = block_weeks(block)
+                if weeks is None:  # 没有周次信息 → 视为每周都有
+                    weeks = range(1, total_weeks + 1)
+
+                for w in weeks:
+                    week_num = f"{w:02}"
+                    if week_num not in results:
+                        continue
+                    results[week_num].append({
+                        "weekday": WEEKDAYS[weekday_index],
+                        "date": get_date_for_week_and_day(week_num, weekday_index),
+                        "section": section,
+                        "name": parsed["name"],
+                        "classroom": parsed["classroom"],
+                    })
+
+    return results
+
+# ------------------ 输出 --------------------
+def write_results(results, out_path=OUT_PATH, compact_path=COMPACT_OUT_PATH, shard_dir=SHARD_DIR):
+    out_path = Path(out_path).resolve()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("完成：已生成", out_path)
+
+    if compact_path:
+        compact_path = CourseStore.from_results(results).save(compact_path)
+        print("完成：已生成", compact_path)
+    if shard_dir:
+        write_shards(results, shard_dir)
+
+    # 已经发布过（dist 下有 index.json）时立即重新发布：前端优先按 index.json 加载，否则会一直使用旧数据
+    if (out_path.parent / INDEX_NAME).exists():
+        publish(out_path.parent)
+    return out_path
+
+
+def write_shards(results, shard_dir=SHARD_DIR):
+    """
+    每周一个紧凑 JSON 分片 + manifest.json：
+    {
+      "version": 1,
+      "term_start": "2025-09-15",
+      "weeks": [{"week": "01", "start": "2025-09-15", "end": "2025-09-21",
+                 "file": "week_01.json", "sha256": "...", "size": 1234, "count": 18}, ...]
+    }
+    - 内容未变化的分片不重写，文件的修改时间与 HTTP 缓存保持有效
+    - 已不存在的周对应的旧分片会被删除
+    返回 manifest 路径
+    """
+    shard_dir = Path(shard_dir).resolve()
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    weeks = []
+    written = 0
+    for week in sorted(results):
+        data = json.dumps(results[week], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        path = shard_dir / f"week_{week}.json"
+        if not path.exists() or path.read_bytes() != data:
+            atomic_write_bytes(path, data)
+            written += 1
+        weeks.append({
+            "week": week,
+            "start": get_date_for_week_and_day(week, 0),
+            "end": get_date_for_week_and_day(week, 6),
+            "file": path.name,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+            "count": len(results[week]),
+        })
+
+    keep = {w["file"] for w in weeks}
+    for stale in shard_dir.glob("week_*.json"):
+        # 只清理 week_NN.json；publish 生成的 week_NN.<哈希>.json 由 publish_artifacts 负责清理
+        if SHARD_FILE_RE.fullmatch(stale.name) and stale.name not in keep:
+            stale.unlink()
+
+    manifest = {
+        "version": SHARD_VERSION,
+        "term_start": TERM_START.strftime("%Y-%m-%d"),
+        "weeks": weeks,
+    }
+    manifest_path = shard_dir / SHARD_MANIFEST_NAME
+    data = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if not manifest_path.exists() or manifest_path.read_bytes() != data:
+        atomic_write_bytes(manifest_path, data)
+    print(f"完成：已生成 {len(weeks)} 个周分片（更新 {written} 个）", manifest_path)
+    return manifest_path
+
+# ------------------ 增量解析清单 --------------------
+def file_sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def load_manifest(path):
+    """
+    读取解析清单；版本或学期开始日期不一致时视为空（缓存的日期已不可用）
+    """
+    try:
+        manifest = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("term_start") != TERM_START.isoformat():
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(path, files):
+    path = Path(path)
+    data = {
+        "version": MANIFEST_VERSION,
+        "term_start": TERM_START.isoformat(),
+        "files": files,
+    }
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+# ------------------ 并行解析 --------------------
+def _parse_job(job):
+    """
+    进程池任务：解析单个文件，异常在子进程内捕获，
+    单个坏文件只会让该文件失败，不会中断整批解析
+    """
+    path, week_num = job
+    try:
+        return parse_one_xls(path, week_num), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def parse_many(jobs, workers=1):
+    """
+    解析多个 (path, week_num)，返回与 jobs 顺序一致的 [(courses, error), ...]
+    workers > 1 时使用进程池（xlrd 解码是纯 Python 的 CPU 密集任务）
+    """
+    jobs = list(jobs)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map 按提交顺序返回，合并结果与串行模式完全一致
+            return list(pool.map(_parse_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    return [_parse_job(job) for job in jobs]
+
 # ------------------ 解析整个目录 --------------------
-def parse_all(directory="extracted_courses"):
+def parse_all(directory="extracted_courses", use_cache=True, workers=1, changed_only=False, write=True):
+    """
+    解析目录下全部单周导出：
+    - 源文件哈希未变化的周直接使用清单中的解析结果，不再调用 xlrd
+    - 其余文件按 workers 并行解析，解析失败的文件会被报告：
+      清单中有该文件上一次的解析结果时沿用，否则跳过
+    - 只有某一周的解析结果确实变化时才重写 JSON
+    - changed_only：变化报告中没有待 convert 处理的周时直接跳过；解析完成后确认这些周
+    - write=False：只返回解析结果，不写 JSON（例如为批量导出的各账号生成日历）
+    """
     directory = Path(directory)
-    results = {}
+    report_weeks = pending_weeks(directory, "convert")  # 在解析前读取：解析期间新导出的变化留到下一次
+    if changed_only and Path(OUT_PATH).exists():
+        if report_weeks is not None and not report_weeks:
+            print("⏸ 变化报告中没有待处理的周：跳过解析")
+            return None
+    manifest_path = directory / MANIFEST_NAME
+    cached_files = load_manifest(manifest_path) if use_cache else {}
 
+    entries = []  # (文件, 周次, 哈希)
     for xls in sorted(directory.glob("*.xls")):
         week_num = xls.stem.split("_")[-1]  # courses_week_01 → 01
-        courses = parse_one_xls(xls, week_num)
+        if not week_num.isdigit():
+            continue  # 例如 courses_week_all.xls（全部周次导出）
+        entries.append((xls, week_num, file_sha256(xls)))
+
+    def is_cached(xls, week_num, digest):
+        cached = cached_files.get(xls.name)
+        return bool(cached) and cached["sha256"] == digest and cached["week"] == week_num
+
+    pending = [(xls, week_num) for xls, week_num, digest in entries if not is_cached(xls, week_num, digest)]
+    parsed = dict(zip((xls.name for xls, _ in pending), parse_many(pending, workers)))
+
+    results = {}
+    files = {}
+    failed = []
+    changed = False
+
+    for xls, week_num, digest in entries:
+        cached = cached_files.get(xls.name)
+        if xls.name not in parsed:
+            courses = cached["courses"]
+        else:
+            courses, error = parsed[xls.name]
+            if error:
+                failed.append(xls.name)
+                if not cached or cached["week"] != week_num:
+                    print(f"❌ 解析失败，已跳过 {xls.name}: {error}")
+                    continue
+                # 沿用上一次成功的解析结果；清单保留旧哈希，下次运行会重新尝试解析
+                print(f"❌ 解析失败，沿用上一次的解析结果 {xls.name}: {error}")
+                files[xls.name] = cached
+                results[f"{week_num:02}"] = cached["courses"]
+                continue
+            # 文件内容变了但解析结果相同（例如导出时间戳不同）不算变化
+            if not cached or cached["courses"] != courses:
+                changed = True
+
+        files[xls.name] = {"sha256": digest, "week": week_num, "courses": courses}
         results[f"{week_num:02}"] = courses
 
+    if set(files) != set(cached_files):
+        changed = True  # 有周被新增、删除或解析失败
+
+    print(f"📦 复用缓存 {len(entries) - len(pending)} 周，重新解析 {len(pending)} 周，失败 {len(failed)} 周")
+
     # 输出 JSON
-    out_path = Path("../frontend/dist/all_weeks_courses.json").resolve()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if write:
+        out_path = Path(OUT_PATH).resolve()
+        outputs = (out_path, Path(COMPACT_OUT_PATH), Path(SHARD_DIR) / SHARD_MANIFEST_NAME)
+        if changed or not all(p.exists() for p in outputs):
+            write_results(results)
+        else:
+            print("无变化：跳过写入", out_path)
 
-    print("完成：已生成", out_path)
+    if files != cached_files:
+        save_manifest(manifest_path, files)
+    if write and report_weeks:
+        ack_weeks(directory, "convert", report_weeks)
+    return results
+
+
+def parse_all_weeks(path="extracted_courses/courses_week_all.xls", total_weeks=TOTAL_WEEKS):
+    """由单个 "全部周次" 导出文件生成 all_weeks_courses.json"""
+    results = expand_all_weeks_xls(path, total_weeks)
+    write_results(results)
     return results
 
 
 if __name__ == "__main__":
-    parse_all()
+    # python convert_xls_to_json.py                       → 解析目录下的单周导出
+    # python convert_xls_to_json.py --workers 8           → 多进程并行解析
+    # python convert_xls_to_json.py --changed-only        → 定时轮询时使用，课表没变化就什么都不做
+    # python convert_xls_to_json.py courses_week_all.xls  → 解析单个全部周次导出
+    parser = argparse.ArgumentParser(description="解析课表导出文件并生成 all_weeks_courses.json")
+    parser.add_argument("all_weeks_file", nargs="?", help="全部周次导出文件（zc 为空导出）")
+    parser.add_argument("--dir", default="extracted_courses", help="单周导出所在目录")
+    parser.add_argument("--workers", type=int, default=1, help="并行解析进程数")
+    parser.add_argument("--no-cache", action="store_true", help="忽略增量解析清单，全部重新解析")
+    parser.add_argument("--changed-only", action="store_true", help="导出变化报告显示没有变化时跳过")
+    args = parser.parse_args()
+
+    if args.all_weeks_file:
+        parse_all_weeks(args.all_weeks_file)
+    else:
+        parse_all(args.dir, use_cache=not args.no_cache, workers=args.workers, changed_only=args.changed_only)
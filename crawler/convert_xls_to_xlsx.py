@@ -1,60 +1,112 @@
+# convert_xls_to_xlsx.py
+# -*- coding: utf-8 -*-
+# 教务系统导出的 xls → 适合手机查看的 xlsx
+#
+# ✅ openpyxl 只写模式流式输出，逐行写入后即释放，不在内存中保留整张表
+# ✅ 全部单元格共用一个命名样式（黑色字体、自动换行、顶部对齐），不再为每个单元格创建 Font / Alignment
+# ✅ 列宽、行高与内容同一遍写入，不需要再打开输出文件二次处理
+#
+# 用法：
+#   python convert_xls_to_xlsx.py                          → 转换 extracted_courses/ 下全部 xls
+#   python convert_xls_to_xlsx.py courses_week_05.xls ...  → 转换指定文件
+#   python convert_xls_to_xlsx.py --workers 4              → 多进程批量转换
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import xlrd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle
+from openpyxl.utils import get_column_letter
+
+STYLE_NAME = "course_cell"
+ROW_HEIGHT = 110          # 移动端才会显示多行
+SECTION_COL_WIDTH = 25    # 第 1 列（节次）及星期日之后的列
+DAY_COL_WIDTH = 22        # 星期一到星期日，让课程不被压扁
+DAY_COLUMNS = range(2, 9)
+
+
+def make_cell_style() -> NamedStyle:
+    return NamedStyle(
+        name=STYLE_NAME,
+        font=Font(color="000000"),                        # 强制黑色字体
+        alignment=Alignment(wrap_text=True, vertical="top"),  # 自动换行、顶部对齐
+    )
+
+
+def column_width(col: int) -> int:
+    return DAY_COL_WIDTH if col in DAY_COLUMNS else SECTION_COL_WIDTH
+
+
 #-----------------XLS->XLSX--------------------
-def convert_xls_to_xlsx_clean(xls_path):
-    xlsx_path = xls_path.with_suffix(".xlsx")
+def convert_xls_to_xlsx_clean(xls_path, xlsx_path=None):
+    """
+    读取 xls 的值（不读样式），单遍写出带统一样式的全新 xlsx，返回输出路径
+    """
+    xls_path = Path(xls_path)
+    xlsx_path = Path(xlsx_path) if xlsx_path else xls_path.with_suffix(".xlsx")
 
-    # 读取 xls（仅读值，不读样式）
-    book = xlrd.open_workbook(xls_path, formatting_info=False)
+    book = xlrd.open_workbook(xls_path, formatting_info=False, on_demand=True)
     sheet = book.sheet_by_index(0)
 
-    # 创建全新的 XLSX —— 无样式污染
-    wb = Workbook()
-    ws = wb.active
+    wb = Workbook(write_only=True)
+    wb.add_named_style(make_cell_style())
+    ws = wb.create_sheet(sheet.name or "Sheet")
 
-    # 设置默认列宽，使移动端可见
+    # 只写模式下列宽必须在写入第一行之前设置
     for col in range(1, sheet.ncols + 1):
-        column_letter = chr(64 + col)
-        ws.column_dimensions[column_letter].width = 25
+        ws.column_dimensions[get_column_letter(col)].width = column_width(col)
 
-    # 写入内容并设置统一样式
     for r in range(sheet.nrows):
-        row_values = sheet.row_values(r)
-        ws.append(row_values)
-
-        for c in range(1, len(row_values) + 1):
-            cell = ws.cell(row=r+1, column=c)
-            cell.font = Font(color="000000")             # 强制黑色字体
-            cell.alignment = Alignment(
-                wrap_text=True,                          # 自动换行
-                vertical="top",
-                horizontal="left"
-            )
+        ws.row_dimensions[r + 1].height = ROW_HEIGHT  # 行写出时读取
+        row = []
+        for value in sheet.row_values(r):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = STYLE_NAME
+            row.append(cell)
+        ws.append(row)
 
+    book.release_resources()
     wb.save(xlsx_path)
     return xlsx_path
 
-#----------------清洗单元格内容：去除前置换行符------------------
-def clean_xlsx_content(path):
-    wb = openpyxl.load_workbook(xlsx_path)
-    ws = wb.active
-
-    # 自动换行、固定行高
-    for row in ws.iter_rows():
-        for cell in row:
-            if cell.value:
-                cell.alignment = Alignment(
-                    wrap_text=True,  # 自动换行
-                    vertical="top"  # 顶部对齐
-                )
-
-    # 设置每行行高（移动端才会显示多行）
-    for row in ws.iter_rows():
-        row_index = row[0].row
-        ws.row_dimensions[row_index].height = 110
-
-    # 可选：列宽固定，让课程不被压扁
-    for col in range(2, 9):  # 星期一到星期日
-        ws.column_dimensions[get_column_letter(col)].width = 22
 
-    wb.save(xlsx_path)
-    return xlsx_path
+def convert_many(paths, workers=1):
+    """批量转换，返回 [(xls, xlsx 或 None, 错误或 None), ...]"""
+    paths = [Path(p) for p in paths]
+
+    def run(path):
+        try:
+            return path, convert_xls_to_xlsx_clean(path), None
+        except Exception as e:
+            return path, None, e
+
+    if workers <= 1 or len(paths) <= 1:
+        return [run(p) for p in paths]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convert_xls_to_xlsx_clean, p) for p in paths]
+        results = []
+        for path, fut in zip(paths, futures):
+            try:
+                results.append((path, fut.result(), None))
+            except Exception as e:
+                results.append((path, None, e))
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把课表 xls 转换为适合手机查看的 xlsx")
+    parser.add_argument("files", nargs="*", help="要转换的 xls 文件（默认 --dir 下全部）")
+    parser.add_argument("--dir", default="extracted_courses", help="未指定文件时转换该目录下的 xls")
+    parser.add_argument("--workers", type=int, default=1, help="并行转换进程数")
+    args = parser.parse_args()
 
+    files = args.files or sorted(Path(args.dir).glob("*.xls"))
+    for xls, xlsx, error in convert_many(files, args.workers):
+        if error:
+            print(f"❌ 转换失败，已跳过 {xls}: {error}")
+        else:
+            print("转换后的文件：", xlsx)
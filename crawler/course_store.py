@@ -0,0 +1,199 @@
+# course_store.py
+# -*- coding: utf-8 -*-
+# 列式紧凑课表存储（all_weeks_courses.compact.json）
+#
+# all_weeks_courses.json 每条记录都重复 weekday / section / name / classroom 字符串，
+# 这里把所有字符串放进一张字符串表，每一列只存整数编号：
+#
+# {
+#   "version": 1,
+#   "weekdays": ["Monday", ...],
+#   "strings":  ["第一大节 ...", "Java Web", "1-502", ...],
+#   "weeks":    ["01", "02", ...],
+#   "dates":    ["2025-09-15", ...],                     # 升序
+#   "columns":  {"week": [...], "date": [...], "weekday": [...], "section": [...], "name": [...], "classroom": [...]},
+#   "index":    {"date": [[起始行, 结束行], ...],          # 与 dates 一一对应，记录按日期、节次排好序
+#                "name": {"字符串编号": [行号, ...]},
+#                "classroom": {"字符串编号": [行号, ...]}}
+# }
+#
+# 查询（CourseStore.query）先用索引取候选行，再对少量候选行过滤，不需要全表扫描
+
+import json
+from bisect import bisect_left
+from pathlib import Path
+
+COMPACT_VERSION = 1
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+STRING_COLUMNS = ("section", "name", "classroom")
+
+
+class CourseStore:
+    def __init__(self, data: dict):
+        if data.get("version") != COMPACT_VERSION:
+            raise ValueError(f"不支持的紧凑课表版本: {data.get('version')}")
+        self.weekdays = data["weekdays"]
+        self.strings = data["strings"]
+        self.weeks = data["weeks"]
+        self.dates = data["dates"]
+        self.columns = data["columns"]
+        self.date_ranges = data["index"]["date"]
+        self.name_index = {int(k): v for k, v in data["index"]["name"].items()}
+        self.classroom_index = {int(k): v for k, v in data["index"]["classroom"].items()}
+        self._string_ids = {s: i for i, s in enumerate(self.strings)}
+        self._week_ids = {w: i for i, w in enumerate(self.weeks)}
+
+    # ================= 构建 =================
+    @classmethod
+    def from_results(cls, results: dict) -> "CourseStore":
+        """results: parse_all 的输出 {"01": [{weekday, date, section, name, classroom}, ...], ...}"""
+        rows = []
+        for week in sorted(results):
+            for course in results[week]:
+                rows.append((course["date"], WEEKDAYS.index(course["weekday"]), week, course))
+        rows.sort(key=lambda r: r[0])  # 稳定排序：同一天内保持原有的节次顺序
+
+        strings, string_ids = [], {}
+
+        def intern(value):
+            if value not in string_ids:
+                string_ids[value] = len(strings)
+                strings.append(value)
+            return string_ids[value]
+
+        weeks = sorted(results)
+        week_ids = {w: i for i, w in enumerate(weeks)}
+        dates = sorted({r[0] for r in rows})
+        date_ids = {d: i for i, d in enumerate(dates)}
+
+        columns = {"week": [], "date": [], "weekday": [], "section": [], "name": [], "classroom": []}
+        date_ranges = [[0, 0] for _ in dates]
+        name_index, classroom_index = {}, {}
+
+        for row_id, (date, weekday, week, course) in enumerate(rows):
+            columns["week"].append(week_ids[week])
+            columns["date"].append(date_ids[date])
+            columns["weekday"].append(weekday)
+            for col in STRING_COLUMNS:
+                columns[col].append(intern(course[col]))
+
+            if row_id == 0 or rows[row_id - 1][0] != date:
+                date_ranges[date_ids[date]][0] = row_id  # 新的一天从这一行开始
+            date_ranges[date_ids[date]][1] = row_id + 1
+            name_index.setdefault(columns["name"][-1], []).append(row_id)
+            classroom_index.setdefault(columns["classroom"][-1], []).append(row_id)
+
+        return cls({
+            "version": COMPACT_VERSION,
+            "weekdays": WEEKDAYS,
+            "strings": strings,
+            "weeks": weeks,
+            "dates": dates,
+            "columns": columns,
+            "index": {
+                "date": date_ranges,
+                "name": {str(k): v for k, v in name_index.items()},
+                "classroom": {str(k): v for k, v in classroom_index.items()},
+            },
+        })
+
+    @classmethod
+    def load(cls, path) -> "CourseStore":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def to_dict(self) -> dict:
+        return {
+            "version": COMPACT_VERSION,
+            "weekdays": self.weekdays,
+            "strings": self.strings,
+            "weeks": self.weeks,
+            "dates": self.dates,
+            "columns": self.columns,
+            "index": {
+                "date": self.date_ranges,
+                "name": {str(k): v for k, v in self.name_index.items()},
+                "classroom": {str(k): v for k, v in self.classroom_index.items()},
+            },
+        }
+
+    def save(self, path) -> Path:
+        path = Path(path).resolve()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        return path
+
+    # ================= 读取 =================
+    def __len__(self):
+        return len(self.columns["date"])
+
+    def record(self, row_id: int) -> dict:
+        """还原为 all_weeks_courses.json 中的记录格式（额外带上 week）"""
+        c = self.columns
+        return {
+            "week": self.weeks[c["week"][row_id]],
+            "weekday": self.weekdays[c["weekday"][row_id]],
+            "date": self.dates[c["date"][row_id]],
+            "section": self.strings[c["section"][row_id]],
+            "name": self.strings[c["name"][row_id]],
+            "classroom": self.strings[c["classroom"][row_id]],
+        }
+
+    def to_results(self) -> dict:
+        """还原为 parse_all 的输出格式（每周内按日期排列；用于校验与兼容旧格式）"""
+        results = {w: [] for w in self.weeks}
+        for row_id in range(len(self)):
+            rec = self.record(row_id)
+            results[rec.pop("week")].append(rec)
+        return results
+
+    def rows_on(self, date: str) -> range:
+        i = bisect_left(self.dates, date)
+        if i == len(self.dates) or self.dates[i] != date:
+            return range(0)
+        return range(*self.date_ranges[i])
+
+    def rows_between(self, start: str, end: str) -> range:
+        """start <= date <= end 的全部行（记录按日期排序，因此是连续区间）"""
+        lo = bisect_left(self.dates, start)
+        hi = bisect_left(self.dates, end)
+        if hi < len(self.dates) and self.dates[hi] == end:
+            hi += 1
+        if lo >= hi:
+            return range(0)
+        return range(self.date_ranges[lo][0], self.date_ranges[hi - 1][1])
+
+    def query(self, date=None, week=None, weekday=None, name=None, classroom=None, start=None, end=None):
+        """
+        按条件查询课程（条件之间为"且"），返回记录列表，按日期、节次排序
+        - date / start+end / name / classroom 走索引；week / weekday 在候选行上过滤
+        - weekday 可以是 "Tuesday" 或 0–6
+        """
+        candidates = []
+        if date is not None:
+            candidates.append(self.rows_on(date))
+        if start is not None or end is not None:
+            candidates.append(self.rows_between(start or self.dates[0], end or self.dates[-1]) if self.dates else range(0))
+        if name is not None:
+            candidates.append(self.name_index.get(self._string_ids.get(name), []))
+        if classroom is not None:
+            candidates.append(self.classroom_index.get(self._string_ids.get(classroom), []))
+        if not candidates:
+            candidates.append(range(len(self)))
+
+        candidates.sort(key=len)
+        rows = candidates[0]
+        for other in candidates[1:]:
+            if isinstance(other, range):
+                rows = [r for r in rows if r in other]  # range 的成员判断是 O(1)
+            else:
+                other = set(other)
+                rows = [r for r in rows if r in other]
+
+        if week is not None:
+            week_id = self._week_ids.get(f"{int(week):02}", -1)
+            rows = [r for r in rows if self.columns["week"][r] == week_id]
+        if weekday is not None:
+            wd = weekday if isinstance(weekday, int) else self.weekdays.index(weekday)
+            rows = [r for r in rows if self.columns["weekday"][r] == wd]
+
+        return [self.record(r) for r in sorted(rows)]
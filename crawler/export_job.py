@@ -0,0 +1,157 @@
+# export_job.py
+# -*- coding: utf-8 -*-
+# 可断点续传的导出任务
+#
+# ✅ 状态文件记录已完成的周次，中断后重新运行只补导缺失的周
+# ✅ 先写临时文件再重命名，任何时候都不会留下半个文件或被登录页覆盖的文件
+# ✅ 请求异常按指数退避 + 随机抖动重试
+# ✅ 检测到 loginForm（登录态失效）时自动重新登录后继续
+# ✅ 可选变化检测（change_detect.ChangeTracker）：内容未变化的周不覆盖本地文件
+
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+STATE_NAME = ".export_state.json"
+STATE_TTL = 6 * 60 * 60  # 超过该时间的未完成任务不再续传，视为新任务
+MAX_ROUNDS = 5           # 最多重试轮数（每轮只请求仍缺失的周）
+BACKOFF_BASE = 1.0       # 秒
+BACKOFF_MAX = 30.0       # 秒
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """写入同目录下的临时文件后 os.replace，保证目标文件要么是旧内容要么是完整的新内容"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def backoff_delay(attempt: int, base=BACKOFF_BASE, cap=BACKOFF_MAX) -> float:
+    """指数退避 + 抖动：在 [d/2, d] 之间随机，d = min(cap, base * 2^attempt)"""
+    d = min(cap, base * (2 ** attempt))
+    return random.uniform(d / 2, d)
+
+
+def is_login_page(content: bytes) -> bool:
+    return b"loginForm" in content or "请输入账号".encode("utf-8") in content
+
+
+class ExportJob:
+    """
+    fetch_many(session, weeks) -> 按周次顺序产出 (week, content, error)，content 为 None 表示 304 未变化
+    login() -> 新的已激活 session；返回 None 表示无法重新登录
+    tracker -> 可选的 ChangeTracker，结束时写出逐周变化报告
+    """
+
+    def __init__(self, out_dir, term, weeks, fetch_many, login,
+                 max_rounds=MAX_ROUNDS, state_ttl=STATE_TTL, tracker=None):
+        self.out_dir = Path(out_dir)
+        self.term = term
+        self.weeks = list(weeks)
+        self.fetch_many = fetch_many
+        self.login = login
+        self.max_rounds = max_rounds
+        self.state_ttl = state_ttl
+        self.tracker = tracker
+        self.state_path = self.out_dir / STATE_NAME
+        self.completed = set()
+        self.changes = {}    # 周次 → changed / unchanged（断点续传时一并恢复）
+        self.started_at = time.time()
+        self.session = None  # run() 结束时的 session（可能已重新登录）
+
+    # ---------- 状态 ----------
+    def load_state(self):
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if state.get("term") != self.term or time.time() - state.get("started_at", 0) > self.state_ttl:
+            return
+        self.completed = set(state.get("completed", [])) & set(self.weeks)
+        self.changes = {int(w): r for w, r in state.get("changes", {}).items() if int(w) in self.completed}
+        self.started_at = state["started_at"]
+        if self.completed:
+            print(f"⏯ 继续上次未完成的导出：已完成 {len(self.completed)} 周")
+
+    def save_state(self):
+        state = {
+            "term": self.term,
+            "started_at": self.started_at,
+            "completed": sorted(self.completed),
+            "changes": {str(w): r for w, r in self.changes.items()},
+        }
+        atomic_write_bytes(self.state_path, json.dumps(state).encode("utf-8"))
+
+    def missing(self):
+        return [w for w in self.weeks if w not in self.completed]
+
+    def save_week(self, week, content) -> Path:
+        path = self.out_dir / f"courses_week_{week:02}.xls"
+        atomic_write_bytes(path, content)
+        return path
+
+    def finish_week(self, week, change):
+        self.completed.add(week)
+        self.changes[week] = change
+        self.save_state()
+
+    # ---------- 执行 ----------
+    def run(self, session):
+        """返回仍缺失的周次列表（空列表表示全部完成）"""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.load_state()
+
+        for attempt in range(self.max_rounds):
+            missing = self.missing()
+            if not missing:
+                break
+
+            login_lost = False
+            for week, content, error in self.fetch_many(session, missing):
+                if error is not None:
+                    print(f"❌ 第 {week} 周失败（请求异常）: {error}")
+                elif content is None:
+                    self.finish_week(week, "unchanged")
+                    print(f"⏸ 第 {week} 周未变化（304）")
+                elif is_login_page(content):
+                    print(f"❌ 第 {week} 周失败（登录失效）")
+                    login_lost = True
+                elif self.tracker is not None and not self.tracker.is_changed(week, content):
+                    self.tracker.commit(week, content)
+                    self.finish_week(week, "unchanged")
+                    print(f"⏸ 第 {week} 周未变化，保留本地文件")
+                else:
+                    path = self.save_week(week, content)
+                    if self.tracker is not None:
+                        self.tracker.commit(week, content)
+                    self.finish_week(week, "changed")
+                    print(f"✅ 第 {week} 周成功: {path}")
+
+            if not self.missing():
+                break
+
+            if login_lost:
+                print("🔑 登录态失效，重新登录后继续导出缺失的周")
+                try:
+                    session = self.login()
+                except Exception as e:
+                    print(f"⚠️ 重新登录异常: {e}")
+                    session = None
+                if session is None:
+                    print("❌ 重新登录失败，保留进度，下次运行时继续")
+                    break
+            elif attempt + 1 < self.max_rounds:
+                delay = backoff_delay(attempt)
+                print(f"⏳ {len(self.missing())} 周导出失败，{delay:.1f}s 后重试")
+                time.sleep(delay)
+
+        self.session = session
+        missing = self.missing()
+        if self.tracker is not None:
+            self.tracker.save(self.term, self.changes, missing)
+        if not missing:
+            self.state_path.unlink(missing_ok=True)  # 全部完成，下次运行是新任务
+        return missing
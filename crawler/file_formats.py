@@ -0,0 +1,244 @@
+# file_formats.py
+# -*- coding: utf-8 -*-
+# 导出文件格式识别与轻量读取器
+#
+# 教务系统导出的 ".xls" 实际可能是：
+# - BIFF 工作簿（OLE 容器，含 Workbook 流）   → xlrd
+# - Word 文档（OLE 容器，含 WordDocument 流） → read_word_text
+# - HTML 表格                                 → read_html_tables
+# - 登录页 HTML（导出时登录态已失效）         → 直接判定失败
+# 先用文件头 / OLE 目录判断格式，避免对每个文件先试 xlrd 再失败重试
+
+import re
+import struct
+from html.parser import HTMLParser
+
+FORMAT_XLS = "xls"
+FORMAT_XLSX = "xlsx"
+FORMAT_DOC = "doc"
+FORMAT_HTML = "html"
+FORMAT_LOGIN = "login"
+FORMAT_UNKNOWN = "unknown"
+
+OLE_MAGIC = b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1"
+ZIP_MAGIC = b"PK\x03\x04"
+
+_END_OF_CHAIN = 0xFFFFFFFE
+_FREE_SECT = 0xFFFFFFFF
+
+
+# ================= OLE（Compound File）=================
+class OleFile:
+    """
+    只读的最小 OLE 复合文档解析器：列出流名称、读取流内容
+    """
+
+    def __init__(self, data: bytes):
+        if data[:8] != OLE_MAGIC:
+            raise ValueError("不是 OLE 复合文档")
+        self.data = data
+        self.sector_size = 1 << struct.unpack_from("<H", data, 0x1E)[0]
+        self.mini_sector_size = 1 << struct.unpack_from("<H", data, 0x20)[0]
+        self.mini_cutoff = struct.unpack_from("<I", data, 0x38)[0]
+
+        self.fat = self._load_fat()
+        self.entries = self._load_directory(struct.unpack_from("<I", data, 0x30)[0])
+
+        root = self.entries[0]
+        self.mini_stream = self._read_chain(root["start"], root["size"])
+        minifat_data = self._read_chain(struct.unpack_from("<I", data, 0x3C)[0])
+        self.minifat = list(struct.unpack(f"<{len(minifat_data) // 4}I", minifat_data))
+
+    def _sector(self, sid: int) -> bytes:
+        offset = (sid + 1) * self.sector_size
+        return self.data[offset:offset + self.sector_size]
+
+    def _load_fat(self):
+        per_sector = self.sector_size // 4
+        difat = list(struct.unpack_from("<109I", self.data, 0x4C))
+
+        # 超过 109 个 FAT 扇区时，其余扇区号保存在 DIFAT 扇区链中
+        sid = struct.unpack_from("<I", self.data, 0x44)[0]
+        seen = set()
+        while sid not in (_END_OF_CHAIN, _FREE_SECT) and sid not in seen:
+            seen.add(sid)
+            values = struct.unpack(f"<{per_sector}I", self._sector(sid))
+            difat.extend(values[:-1])
+            sid = values[-1]
+
+        fat = []
+        for sid in difat:
+            if sid in (_END_OF_CHAIN, _FREE_SECT):
+                continue
+            fat.extend(struct.unpack(f"<{per_sector}I", self._sector(sid)))
+        return fat
+
+    @staticmethod
+    def _chain(table, start):
+        sid, seen = start, set()
+        while sid < len(table) and sid not in seen:
+            seen.add(sid)
+            yield sid
+            sid = table[sid]
+
+    def _read_chain(self, start: int, size: int = None) -> bytes:
+        data = b"".join(self._sector(sid) for sid in self._chain(self.fat, start))
+        return data if size is None else data[:size]
+
+    def _read_mini_chain(self, start: int, size: int) -> bytes:
+        ss = self.mini_sector_size
+        data = b"".join(self.mini_stream[sid * ss:(sid + 1) * ss] for sid in self._chain(self.minifat, start))
+        return data[:size]
+
+    def _load_directory(self, start: int):
+        raw = self._read_chain(start)
+        entries = []
+        for offset in range(0, len(raw) - 127, 128):
+            name_len = struct.unpack_from("<H", raw, offset + 64)[0]
+            entries.append({
+                "name": raw[offset:offset + max(0, name_len - 2)].decode("utf-16-le", errors="ignore"),
+                "type": raw[offset + 66],  # 1 = storage, 2 = stream, 5 = root
+                "start": struct.unpack_from("<I", raw, offset + 116)[0],
+                "size": struct.unpack_from("<I", raw, offset + 120)[0],
+            })
+        return entries
+
+    def stream_names(self):
+        return [e["name"] for e in self.entries if e["type"] == 2]
+
+    def read_stream(self, name: str) -> bytes:
+        for e in self.entries:
+            if e["type"] == 2 and e["name"] == name:
+                if e["size"] < self.mini_cutoff:
+                    return self._read_mini_chain(e["start"], e["size"])
+                return self._read_chain(e["start"], e["size"])
+        raise KeyError(name)
+
+
+# ================= 格式识别 =================
+def _is_login_page(head: bytes) -> bool:
+    return b"loginForm" in head or "请输入账号".encode("utf-8") in head
+
+
+def sniff_format(data: bytes) -> str:
+    """
+    根据文件头（OLE 时再看目录中的流名称）判断真实格式
+    """
+    if data[:8] == OLE_MAGIC:
+        try:
+            names = set(OleFile(data).stream_names())
+        except (ValueError, struct.error, IndexError):
+            return FORMAT_UNKNOWN
+        if "Workbook" in names or "Book" in names:
+            return FORMAT_XLS
+        if "WordDocument" in names:
+            return FORMAT_DOC
+        return FORMAT_UNKNOWN
+
+    if data[:4] == ZIP_MAGIC:
+        return FORMAT_XLSX
+
+    head = data[:4096].lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if head.startswith(b"<"):
+        return FORMAT_LOGIN if _is_login_page(data) else FORMAT_HTML
+    return FORMAT_UNKNOWN
+
+
+# ================= Word（.doc）=================
+def read_word_text(data: bytes) -> str:
+    """
+    通过 FIB + 分段表（piece table）提取 Word 97-2003 文档正文：
+    表格单元格以 \\x07 结尾，单元格内段落以 \\r 分隔
+    """
+    ole = OleFile(data)
+    doc = ole.read_stream("WordDocument")
+    if struct.unpack_from("<H", doc, 0)[0] != 0xA5EC:
+        raise ValueError("WordDocument 流的 FIB 标识不正确")
+
+    flags = struct.unpack_from("<H", doc, 0x0A)[0]
+    table = ole.read_stream("1Table" if flags & 0x0200 else "0Table")
+    ccp_text = struct.unpack_from("<i", doc, 0x4C)[0]
+    fc_clx, lcb_clx = struct.unpack_from("<II", doc, 0x1A2)
+    clx = table[fc_clx:fc_clx + lcb_clx]
+
+    # 跳过 Prc（格式信息），找到 Pcdt
+    pos = 0
+    while pos < len(clx) and clx[pos] == 0x01:
+        pos += 3 + struct.unpack_from("<h", clx, pos + 1)[0]
+    if pos >= len(clx) or clx[pos] != 0x02:
+        raise ValueError("未找到 Word 分段表")
+    lcb = struct.unpack_from("<I", clx, pos + 1)[0]
+    plc = clx[pos + 5:pos + 5 + lcb]
+
+    n = (lcb - 4) // 12
+    cps = struct.unpack_from(f"<{n + 1}I", plc, 0)
+    parts = []
+    for i in range(n):
+        start, end = cps[i], min(cps[i + 1], ccp_text)
+        if start >= end:
+            break
+        fc = struct.unpack_from("<I", plc, 4 * (n + 1) + 8 * i + 2)[0]
+        if fc & 0x40000000:  # 压缩存储：单字节 cp1252
+            offset = (fc & 0x3FFFFFFF) // 2
+            parts.append(doc[offset:offset + end - start].decode("cp1252", errors="replace"))
+        else:
+            parts.append(doc[fc:fc + 2 * (end - start)].decode("utf-16-le", errors="replace"))
+    return "".join(parts)
+
+
+def word_table_cells(text: str):
+    """
+    按单元格结束符拆分 Word 正文，返回按阅读顺序排列的单元格文本
+    （行结束符会产生空单元格，由调用方按表头 / 行首内容对齐）
+    """
+    text = re.sub(r"\x13[^\x14\x15]*\x14?|\x15", "", text)  # 去掉域代码
+    return [cell.replace("\r", "\n").replace("\x0b", "\n") for cell in text.split("\x07")]
+
+
+# ================= HTML =================
+class _TableParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tables = []
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self.tables.append([])
+        elif tag == "tr" and self.tables:
+            self._row = []
+            self.tables[-1].append(self._row)
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+        elif tag == "br" and self._cell is not None:
+            self._cell.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self._row.append("".join(self._cell).replace("\xa0", " "))
+            self._cell = None
+        elif tag == "tr":
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def decode_html(data: bytes) -> str:
+    m = re.search(rb"charset=[\"']?([\w-]+)", data[:2048], re.I)
+    for enc in ([m.group(1).decode("ascii")] if m else []) + ["utf-8", "gb18030"]:
+        try:
+            return data.decode(enc)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return data.decode("utf-8", errors="replace")
+
+
+def read_html_tables(data: bytes):
+    """返回页面中所有表格：[[行单元格文本, ...], ...]"""
+    parser = _TableParser()
+    parser.feed(decode_html(data))
+    parser.close()
+    return parser.tables
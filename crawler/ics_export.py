@@ -0,0 +1,349 @@
+# ics_export.py
+# -*- coding: utf-8 -*-
+# 课表 → iCalendar（.ics）订阅源
+#
+# ✅ 每节课的 UID 由 账号 + 日期 + 开始时间 + 课程名 决定，重新生成时同一节课 UID 不变
+# ✅ 状态文件记录每个 UID 的内容哈希：内容未变化的课沿用原 DTSTAMP / SEQUENCE，
+#    变化的课 SEQUENCE + 1，日历客户端只更新真正变化的事件
+# ✅ 每个账号一个全学期订阅源（all.ics）+ 每周一个订阅源（week_05.ics）
+# ✅ 输出内容确定（同样的课表得到同样的字节），未变化的文件不重写，
+#    静态服务器的 ETag / Last-Modified 保持不变，客户端轮询只得到 304
+#
+# 输出目录结构：
+#   ../frontend/dist/ics/all.ics, week_01.ics ...          ← all_weeks_courses.json
+#   ../frontend/dist/ics/<令牌>/all.ics, week_01.ics ...   ← --accounts 批量导出目录下的各账号
+#
+# 各账号的订阅源在公开的 dist 目录下，目录名不能用学号（可以直接猜到别人的课表）：
+#   令牌 = HMAC-SHA256(密钥, 学号) 的前 32 位十六进制，不知道密钥就无法由学号推出
+#   密钥取环境变量 JW_ICS_SECRET，未设置时首次运行生成并保存到 extracted_courses/.ics_secret（不公开）
+#   每个账号的令牌目录写在 extracted_courses/.ics_feeds.json，把 ics/<令牌>/all.ics 的地址单独发给本人即可
+#   更换密钥会使全部旧订阅地址失效（旧目录会被清理）；账号从批量导出目录中移除后，
+#   它的订阅源目录与状态记录也会在下次运行时删除
+#
+# 用法：
+#   python ics_export.py                              → 由 all_weeks_courses.json 生成
+#   python ics_export.py --accounts extracted_courses → 为批量导出的每个账号生成
+#   python cli.py ics [--accounts extracted_courses]
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+from datetime import datetime, timezone
+from pathlib import Path
+
+from export_job import atomic_write_bytes
+
+JSON_PATH = Path("../frontend/dist/all_weeks_courses.json")
+ICS_DIR = Path("../frontend/dist/ics")
+STATE_PATH = Path("extracted_courses/.ics_state.json")  # 不放在 dist 下，避免被静态服务器公开
+SECRET_PATH = Path("extracted_courses/.ics_secret")     # 各账号订阅源目录令牌的 HMAC 密钥（JW_ICS_SECRET 优先）
+FEEDS_PATH = Path("extracted_courses/.ics_feeds.json")  # 账号 → 订阅源目录，用于把订阅地址发给本人
+TOKEN_LENGTH = 32
+DEFAULT_ACCOUNT = "default"
+
+TZID = "Asia/Shanghai"
+UID_DOMAIN = "course-schedule"
+PRODID = "-//course-schedule//ics_export//CN"
+REFRESH_INTERVAL = "PT6H"  # 建议客户端的刷新间隔
+
+# 节次单元格没有时间时使用的默认作息
+SECTION_TIMES = {
+    "第一大节": ("08:20", "09:55"),
+    "第二大节": ("10:15", "11:50"),
+    "第三大节": ("14:00", "15:35"),
+    "第四大节": ("15:55", "17:30"),
+    "第五大节": ("19:00", "20:40"),
+    "第六大节": ("20:45", "22:20"),
+}
+TIME_RE = re.compile(r"(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})")
+SECTION_NAME_RE = re.compile(r"第.大节")
+
+VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TZID}",
+    f"X-LIC-LOCATION:{TZID}",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0800",
+    "TZOFFSETTO:+0800",
+    "TZNAME:CST",
+    "DTSTART:19700101T000000",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]
+
+
+# ================= 工具 =================
+def section_times(section):
+    """"第一大节 (01,02小节) 08:20-09:55" → ("0820", "0955")；无法识别时返回 None"""
+    m = TIME_RE.search(section)
+    if m:
+        return f"{int(m.group(1)):02}{m.group(2)}", f"{int(m.group(3)):02}{m.group(4)}"
+    m = SECTION_NAME_RE.search(section)
+    if m and m.group(0) in SECTION_TIMES:
+        start, end = SECTION_TIMES[m.group(0)]
+        return start.replace(":", ""), end.replace(":", "")
+    return None
+
+
+def escape_text(value):
+    """RFC 5545 TEXT 转义"""
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold_line(line):
+    """超过 75 字节的内容行折行（不拆开 UTF-8 多字节字符）"""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    parts, current, size = [], "", 0
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if size + width > (75 if not parts else 74):  # 续行开头的空格占 1 字节
+            parts.append(current)
+            current, size = "", 0
+        current += ch
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def safe_name(account):
+    return re.sub(r"[^\w.-]", "_", account)
+
+
+def load_secret(path=SECRET_PATH) -> bytes:
+    """订阅源令牌的密钥：JW_ICS_SECRET，否则读取密钥文件，不存在时生成（只允许当前用户读写）"""
+    if os.environ.get("JW_ICS_SECRET"):
+        return os.environ["JW_ICS_SECRET"].encode("utf-8")
+    path = Path(path)
+    try:
+        return path.read_text(encoding="utf-8").strip().encode("utf-8")
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    secret = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secret)
+    print("🔑 已生成订阅源密钥", path.resolve())
+    return secret.encode("utf-8")
+
+
+def feed_token(account, secret: bytes) -> str:
+    """账号订阅源目录名：不知道密钥就无法由学号推出"""
+    return hmac.new(secret, account.encode("utf-8"), hashlib.sha256).hexdigest()[:TOKEN_LENGTH]
+
+
+def remove_feed_dir(path: Path) -> bool:
+    """删除只包含 .ics 文件的订阅源目录；含有其他文件的目录不动"""
+    files = list(path.iterdir())
+    if any(f.is_dir() or f.suffix != ".ics" for f in files):
+        return False
+    for f in files:
+        f.unlink()
+    path.rmdir()
+    return True
+
+
+# ================= 事件 =================
+def build_events(results, account=DEFAULT_ACCOUNT):
+    """
+    results: parse_all 的输出 {"01": [{weekday, date, section, name, classroom}, ...], ...}
+    返回 {周次: [event, ...]}，event 含 uid / start / end / summary / location / description / hash
+    """
+    events = {}
+    seen = {}
+    for week in sorted(results):
+        for course in results[week]:
+            times = section_times(course["section"])
+            if not times:
+                continue
+            day = course["date"].replace("-", "")
+            digest = hashlib.sha1(course["name"].encode("utf-8")).hexdigest()[:8]
+            key = f"{safe_name(account)}-{day}-{times[0]}-{digest}"
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > 1:
+                key += f"-{seen[key]}"  # 同一时间同名课程出现多次（例如分教室上课）
+            event = {
+                "uid": f"{key}@{UID_DOMAIN}",
+                "start": f"{day}T{times[0]}00",
+                "end": f"{day}T{times[1]}00",
+                "summary": course["name"],
+                "location": course["classroom"],
+                "description": f"第 {int(week)} 周 {course['section']}",
+            }
+            fields = [event[k] for k in ("start", "end", "summary", "location", "description")]
+            event["hash"] = hashlib.sha256("\n".join(fields).encode("utf-8")).hexdigest()
+            events.setdefault(week, []).append(event)
+    return events
+
+
+def stamp_events(events, state):
+    """
+    按状态文件确定每个事件的 DTSTAMP 与 SEQUENCE：内容没变沿用旧值，变了 SEQUENCE + 1
+    返回 (新状态, 变化的事件数)
+    """
+    now = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    new_state, changed = {}, 0
+    for week_events in events.values():
+        for event in week_events:
+            old = state.get(event["uid"])
+            if old and old["hash"] == event["hash"]:
+                entry = old
+            else:
+                entry = {"hash": event["hash"], "dtstamp": now, "sequence": old["sequence"] + 1 if old else 0}
+                changed += 1
+            event["dtstamp"], event["sequence"] = entry["dtstamp"], entry["sequence"]
+            new_state[event["uid"]] = entry
+    return new_state, changed
+
+
+def render_calendar(events, name):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+        f"X-WR-TIMEZONE:{TZID}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+        *VTIMEZONE,
+    ]
+    for e in sorted(events, key=lambda e: (e["start"], e["uid"])):
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{e['uid']}",
+            f"DTSTAMP:{e['dtstamp']}",
+            f"SEQUENCE:{e['sequence']}",
+            f"DTSTART;TZID={TZID}:{e['start']}",
+            f"DTEND;TZID={TZID}:{e['end']}",
+            f"SUMMARY:{escape_text(e['summary'])}",
+            f"LOCATION:{escape_text(e['location'])}",
+            f"DESCRIPTION:{escape_text(e['description'])}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(fold_line(line) for line in lines) + "\r\n").encode("utf-8")
+
+
+# ================= 输出 =================
+def write_if_changed(path: Path, data: bytes) -> bool:
+    if path.exists() and path.read_bytes() == data:
+        return False
+    atomic_write_bytes(path, data)
+    return True
+
+
+def export_account(results, out_dir, state, account=DEFAULT_ACCOUNT, title="课程表"):
+    """
+    生成一个账号的全部订阅源，返回 (该账号的新状态, 统计)
+    已不存在的周对应的旧 week_NN.ics 会被删除
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    events = build_events(results, account)
+    account_state, changed = stamp_events(events, state)
+
+    written = 0
+    feeds = {"all.ics": render_calendar([e for week in events.values() for e in week], title)}
+    for week in results:
+        feeds[f"week_{week}.ics"] = render_calendar(events.get(week, []), f"{title} 第 {int(week)} 周")
+    for name, data in feeds.items():
+        written += write_if_changed(out_dir / name, data)
+    for stale in out_dir.glob("week_*.ics"):
+        if stale.name not in feeds:
+            stale.unlink()
+
+    stats = {"events": len(account_state), "changed": changed,
+             "removed": len(set(state) - set(account_state)), "feeds": len(feeds), "written": written}
+    return account_state, stats
+
+
+def load_state(path=STATE_PATH):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(path, json.dumps(state, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+def print_stats(account, stats, out_dir):
+    print(f"📆 {account}: {stats['events']} 节课，变化 {stats['changed']}，删除 {stats['removed']}，"
+          f"订阅源 {stats['feeds']} 个（重写 {stats['written']} 个）→ {Path(out_dir).resolve()}")
+
+
+def export_from_json(json_path=JSON_PATH, out_dir=ICS_DIR, state_path=STATE_PATH):
+    """由 all_weeks_courses.json 生成 ics/all.ics 与各周订阅源"""
+    results = json.loads(Path(json_path).read_text(encoding="utf-8"))
+    state = load_state(state_path)
+    state[DEFAULT_ACCOUNT], stats = export_account(results, out_dir, state.get(DEFAULT_ACCOUNT, {}))
+    save_state(state, state_path)
+    print_stats(DEFAULT_ACCOUNT, stats, out_dir)
+    return stats
+
+
+def export_accounts(accounts_dir="extracted_courses", out_dir=ICS_DIR, state_path=STATE_PATH, workers=1,
+                    secret_path=SECRET_PATH, feeds_path=FEEDS_PATH):
+    """
+    为批量导出目录（extracted_courses/<学号>/courses_week_NN.xls）下的每个账号生成订阅源
+    - 输出到 out_dir/<令牌>/，账号 → 令牌目录写入 feeds_path
+    - 已不在批量导出目录中的账号：删除状态记录；不属于任何当前账号的令牌目录（包括旧版按学号命名的目录）一并删除
+    """
+    from convert_xls_to_json import parse_all  # 只有按账号解析导出文件时才需要 xlrd
+
+    secret = load_secret(secret_path)
+    out_dir = Path(out_dir)
+    state = load_state(state_path)
+    summary = {}
+    feeds = {}
+    for account_dir in sorted(p for p in Path(accounts_dir).iterdir() if p.is_dir()):
+        if not any(account_dir.glob("*.xls")):
+            continue
+        account = account_dir.name
+        results = parse_all(account_dir, workers=workers, write=False)
+        feeds[account] = feed_token(account, secret)
+        target = out_dir / feeds[account]
+        state[account], summary[account] = export_account(results, target, state.get(account, {}), account,
+                                                          title=f"课程表 {account}")
+        print_stats(account, summary[account], target)
+
+    removed = [account for account in state if account != DEFAULT_ACCOUNT and account not in feeds]
+    for account in removed:
+        del state[account]
+    pruned = sum(remove_feed_dir(p) for p in (out_dir.iterdir() if out_dir.is_dir() else ())
+                 if p.is_dir() and p.name not in feeds.values())
+    if removed or pruned:
+        print(f"🧹 清理已移除账号的状态 {len(removed)} 个，旧订阅源目录 {pruned} 个")
+
+    save_state(state, state_path)
+    atomic_write_bytes(Path(feeds_path), json.dumps(feeds, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8"))
+    print("🔗 各账号订阅源目录:", Path(feeds_path).resolve())
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成课表 iCalendar 订阅源")
+    parser.add_argument("--json", default=str(JSON_PATH), help="all_weeks_courses.json 路径")
+    parser.add_argument("--accounts", help="批量导出根目录：为其中每个账号子目录生成订阅源")
+    parser.add_argument("--out", default=str(ICS_DIR), help="订阅源输出目录")
+    parser.add_argument("--state", default=str(STATE_PATH), help="UID / SEQUENCE 状态文件")
+    parser.add_argument("--workers", type=int, default=1, help="按账号解析时的并行进程数")
+    args = parser.parse_args()
+
+    if args.accounts:
+        export_accounts(args.accounts, args.out, args.state, args.workers)
+    else:
+        export_from_json(args.json, args.out, args.state)
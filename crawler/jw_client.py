@@ -0,0 +1,267 @@
+# jw_client.py
+# -*- coding: utf-8 -*-
+# 教务系统客户端公共部分：配置、密码混淆、登录、登录态缓存、单周导出请求
+#
+# parse_course_this_week.py / parse_course_by_week.py / parse_course_all_week.py / cli.py 共用
+# 本模块只依赖 requests；验证码识别（ddddocr / Tesseract）在真正需要登录时才导入，见 captcha_solvers.py
+
+import os
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import requests
+
+from export_job import atomic_write_bytes, is_login_page
+from session_store import restore_session, save_session
+
+# ================= CONFIG =================
+BASE = os.environ.get("JW_BASE_URL", "https://jwyth.hnkjxy.net.cn").rstrip("/")  # 可指向 mock_server.py
+LOGIN_PAGE = BASE + "/"
+SESS_URL = BASE + "/Logon.do?method=logon&flag=sess"
+LOGIN_POST = BASE + "/Logon.do?method=logon"
+CAPTCHA_URL = BASE + "/verifycode.servlet"
+COURSE_EXPORT_URL = BASE + "/jsxsd/xskb/xskb_print.do"
+SESSION_PROBE_URL = BASE + "/jsxsd/xskb/xskb_list.do"  # 验证缓存登录态用的轻量页面
+
+COMMON_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/142.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9",
+    "Connection": "keep-alive",
+}
+
+# 学期配置
+CURRENT_TERM = "2025-2026-1"
+TERM_START = datetime(2025, 9, 15, tzinfo=timezone(timedelta(hours=8)))  # 开学日（第一周的周一）
+KBJCMSID = "C26030BDC5F8456CBE75B8779AED2F8A"
+
+# 验证码识别方案："ddddocr"（全自动）或 "tesseract"（识别失败时人工输入）
+CAPTCHA_SOLVER = os.environ.get("JW_CAPTCHA_SOLVER", "ddddocr")
+
+# 默认账号（单账号运行时使用）；多账号见 batch_crawler.py
+USERNAME = os.environ.get("JW_USERNAME")
+PASSWORD = os.environ.get("JW_PASSWORD") or ""
+
+# 登录页保存位置（排查登录失败用，mock_server.py 也用它模拟登录页）；批量模式传 None 不保存
+DEBUG_LOGIN_PAGE = Path("debug/debug_loginpage.html")
+
+
+def require_credentials():
+    if not USERNAME:
+        raise SystemExit("❌ 请设置环境变量 JW_USERNAME / JW_PASSWORD")
+
+
+# ================= UTIL =================
+def save_text(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def make_encoded(username, password, scode, sxh):
+    """
+    教务系统特有的密码混淆算法
+    """
+    code = f"{username}%%%{password}"
+    encoded = ""
+    i = 0
+    for ch in code:
+        n = int(sxh[i]) if i < len(sxh) and sxh[i].isdigit() else 0
+        encoded += ch + scode[:n]
+        scode = scode[n:]
+        i += 1
+    return encoded
+
+def get_current_week(now=None):
+    """按开学日推算当前是第几周（开学前按第 1 周处理）"""
+    now = now or datetime.now(timezone(timedelta(hours=8)))
+    days_diff = (now - TERM_START).days
+    if days_diff < 0:
+        return 1
+    return (days_diff // 7) + 1
+
+# ================= LOGIN =================
+def login_via_raw_body(username=None, password=None, solver=None, limiter=None, debug_page=DEBUG_LOGIN_PAGE):
+    """
+    完整登录流程：登录页 → scode/sxh → 验证码 → 提交
+    solver: 验证码识别方案名称，默认 CAPTCHA_SOLVER
+    limiter: 多账号共享的 HostRateLimiter，登录的每一步也计入限速
+    debug_page: 登录页 HTML 的保存路径，None 时不保存
+    """
+    from captcha_solvers import get_solver  # 识别模型 / OCR 只在真正登录时才加载
+
+    username = username or USERNAME
+    password = PASSWORD if password is None else password
+    solve_captcha = get_solver(solver or CAPTCHA_SOLVER)  # ddddocr 在后台加载模型，与下面的网络请求并行
+
+    s = requests.Session()
+    s.headers.update(COMMON_HEADERS)
+
+    def wait(url):
+        if limiter:
+            limiter.wait(url)
+
+    print("Step1: GET 登录页")
+    wait(LOGIN_PAGE)
+    r1 = s.get(LOGIN_PAGE, timeout=15)
+    if debug_page:
+        save_text(Path(debug_page), r1.text)
+
+    print("Step2: 获取 scode / sxh")
+    wait(SESS_URL)
+    r_sess = s.post(SESS_URL, timeout=15)
+    if "#" not in r_sess.text:
+        raise RuntimeError("flag=sess 未返回 scode/sxh")
+    scode, sxh = r_sess.text.strip().split("#", 1)
+
+    wait(CAPTCHA_URL)
+    captcha = solve_captcha(s)
+    encoded = make_encoded(username, password, scode, sxh)
+
+    body = (
+        f"userAccount={username}"
+        f"&userPassword="
+        f"&RANDOMCODE={urllib.parse.quote_plus(captcha)}"
+        f"&encoded={urllib.parse.quote_plus(encoded)}"
+    )
+
+    headers = {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "Origin": BASE,
+        "Referer": LOGIN_PAGE,
+        "User-Agent": COMMON_HEADERS["User-Agent"],
+    }
+
+    print("Step3: 提交登录请求")
+    wait(LOGIN_POST)
+    r_post = s.post(
+        LOGIN_POST,
+        data=body.encode(),
+        headers=headers,
+        allow_redirects=False,
+        timeout=20,
+    )
+    return s, r_post
+
+def activate_login(session, login_resp, limiter=None, debug_page=DEBUG_LOGIN_PAGE) -> bool:
+    """
+    访问登录成功后的重定向地址以激活登录态
+    """
+    if "Location" not in login_resp.headers:
+        print(f"❌ 登录失败，请检查 {debug_page}" if debug_page else "❌ 登录失败")
+        return False
+
+    loc = login_resp.headers["Location"]
+    if loc.startswith("/"):
+        loc = BASE + loc
+
+    if limiter:
+        limiter.wait(loc)
+    session.get(loc, timeout=15)
+    return True
+
+def login_fresh(username=None, password=None, solver=None, limiter=None, debug_page=DEBUG_LOGIN_PAGE):
+    """
+    完整登录（验证码 + 登录 + 激活）并缓存登录态；失败返回 None
+    """
+    from captcha_archive import get_archive
+
+    username = username or USERNAME
+    s, r = login_via_raw_body(username, password, solver, limiter, debug_page)
+    ok = activate_login(s, r, limiter, debug_page)
+    get_archive().record_login(ok)  # 归档的验证码只有登录成功时才算已验证的标注
+    if not ok:
+        return None
+    save_session(s, username)
+    return s
+
+def get_session(username=None, password=None, solver=None, limiter=None, debug_page=DEBUG_LOGIN_PAGE):
+    """
+    优先复用本地缓存的登录态，失效时才走完整登录流程（验证码 + 登录）
+    每个账号的登录态单独缓存，不传账号时使用 JW_USERNAME / JW_PASSWORD
+    """
+    username = username or USERNAME
+    if limiter:
+        limiter.wait(SESSION_PROBE_URL)  # 验证缓存登录态的请求
+    s = restore_session(username, SESSION_PROBE_URL, COMMON_HEADERS)
+    if s:
+        print(f"♻️ {username} 复用已缓存的登录态，跳过验证码与登录")
+        return s
+
+    return login_fresh(username, password, solver, limiter, debug_page)
+
+# ================= EXPORT =================
+class HostRateLimiter:
+    """
+    按主机限速（线程安全）：同一主机的两次请求之间至少间隔 1/rate 秒
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def fetch_week(session, week, term: str = None, limiter: HostRateLimiter = None, tracker=None) -> bytes:
+    """
+    导出单周课程表，返回原始响应内容；week 为 "" 时导出全部周次
+    传入 tracker（change_detect.ChangeTracker）时发送条件请求，服务器返回 304 时返回 None
+    """
+    params = {
+        "xnxq01id": term or CURRENT_TERM,
+        "zc": str(week),
+        "kbjcmsid": KBJCMSID,
+        "wkbkc": "1",
+    }
+    headers = {"Referer": SESSION_PROBE_URL}
+    if tracker:
+        headers.update(tracker.conditional_headers(week))
+    if limiter:
+        limiter.wait(COURSE_EXPORT_URL)
+    r = session.get(COURSE_EXPORT_URL, params=params, headers=headers, timeout=20)
+    if r.status_code == 304:
+        return None
+    r.raise_for_status()  # 5xx 错误页不能当作课表保存
+    if tracker:
+        tracker.remember(week, r)
+    return r.content
+
+def export_week(session, week, term=None, out_root="extracted_courses"):
+    """
+    导出单周（week 为 "" 时导出全部周次）并保存到 out_root，返回文件路径；登录失效时返回 None
+    """
+    label = f"{week:02}" if isinstance(week, int) else (week or "all")
+    print(f"📤 正在导出{f'第 {week} 周' if week else '全部周次'}课程表...")
+    try:
+        content = fetch_week(session, week, term)
+    except requests.RequestException as e:
+        print(f"❌ 导出失败（请求异常）: {e}")
+        return None
+
+    if is_login_page(content):
+        print("❌ 导出失败: ⚠️ 登录态失效，返回的是登录页 HTML")
+        return None
+
+    out_dir = Path(out_root)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    save_path = out_dir / f"courses_week_{label}.xls"
+    atomic_write_bytes(save_path, content)
+    print(f"✅ 导出成功: {save_path}")
+    return save_path
@@ -0,0 +1,340 @@
+# mock_server.py
+# -*- coding: utf-8 -*-
+# 本地模拟教务系统（用于压测与回归测试，不访问真实学校服务器）
+#
+# 实现的流程与真实系统一致：
+#   GET  /                                   登录页（含 loginForm）
+#   POST /Logon.do?method=logon&flag=sess    返回 "scode#sxh"
+#   GET  /verifycode.servlet                 验证码图片
+#   POST /Logon.do?method=logon              校验 RANDOMCODE 与 encoded，成功 302 跳转
+#   GET  /jsxsd/framework/xsMain.jsp         登录后主页
+#   GET  /jsxsd/xskb/xskb_list.do            课表页（登录态探测）
+#   GET  /jsxsd/xskb/xskb_print.do?zc=N      返回 extracted_courses/ 中的对应周导出（支持 ETag / If-None-Match，可关闭）
+#                                            zc 为空时返回全部周次导出，不是数字时返回 400
+#   GET  /__stats                            请求计数（JSON）
+# 未登录访问受保护页面时返回登录页 HTML，与真实系统表现相同
+#
+# 用法：
+#   python mock_server.py --port 8080 --account 2024001:secret --captcha-code abcd --latency 0.05 --error-rate 0.02
+#   JW_BASE_URL=http://127.0.0.1:8080 JW_USERNAME=2024001 JW_PASSWORD=secret python parse_course_all_week.py
+
+import argparse
+import email.utils
+import hashlib
+import io
+import json
+import random
+import secrets
+import string
+import threading
+import time
+import urllib.parse
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURE_DIR = Path(__file__).parent / "extracted_courses"
+LOGIN_PAGE_FILE = Path(__file__).parent / "debug" / "debug_loginpage.html"
+CAPTCHA_CHARSET = "0123456789abcdefghjklmnopqrstuvwxyz"
+MAX_SESSIONS = 10000  # 超出后淘汰最久未使用的会话，长时间压测时内存不会无限增长
+
+FALLBACK_LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>登录</title></head><body>
+<form id="loginForm" name="loginForm" action="/Logon.do?method=logon" method="post">
+<input type="text" id="userAccount" name="userAccount" placeholder="请输入账号">
+<img src="/verifycode.servlet" id="SafeCodeImg">
+</form></body></html>"""
+
+
+def make_encoded(username, password, scode, sxh):
+    """与客户端相同的密码混淆算法，用于校验登录请求"""
+    code = f"{username}%%%{password}"
+    encoded = ""
+    i = 0
+    for ch in code:
+        n = int(sxh[i]) if i < len(sxh) and sxh[i].isdigit() else 0
+        encoded += ch + scode[:n]
+        scode = scode[n:]
+        i += 1
+    return encoded
+
+
+def render_captcha(text: str) -> bytes:
+    """生成验证码 PNG；未安装 Pillow 时返回 1×1 空白图"""
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return (
+            b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x00\x00\x00\x00:~\x9bU"
+            b"\x00\x00\x00\nIDATx\x9cc\xf8\x0f\x00\x01\x01\x01\x00\x18\xdd\x8d\xb0\x00\x00\x00\x00IEND\xaeB`\x82"
+        )
+
+    img = Image.new("RGB", (62, 22), "white")
+    draw = ImageDraw.Draw(img)
+    for i, ch in enumerate(text):
+        draw.text((6 + i * 13, 4 + random.randint(-2, 2)), ch, fill=(random.randint(0, 120),) * 3)
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+class MockState:
+    """服务端会话与配置（所有请求线程共享）"""
+
+    def __init__(self, accounts=None, default_password="", captcha_code=None, accept_any_captcha=False,
+                 latency=0.0, jitter=0.0, error_rate=0.0, session_ttl=0, fixture_dir=FIXTURE_DIR,
+                 conditional=True, max_sessions=MAX_SESSIONS):
+        self.accounts = accounts or {}
+        self.default_password = default_password
+        self.captcha_code = captcha_code
+        self.accept_any_captcha = accept_any_captcha
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.session_ttl = session_ttl
+        self.fixture_dir = Path(fixture_dir)
+        self.conditional = conditional
+        self.login_page = (
+            LOGIN_PAGE_FILE.read_text(encoding="utf-8") if LOGIN_PAGE_FILE.exists() else FALLBACK_LOGIN_PAGE
+        ).encode("utf-8")
+
+        self.sessions = OrderedDict()  # 按最近使用排序，最久未使用的在最前
+        self.max_sessions = max_sessions
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def password_for(self, username):
+        if self.accounts:
+            return self.accounts.get(username)
+        return self.default_password  # 未配置账号时任何学号都可登录
+
+    def get_session(self, sid):
+        with self.lock:
+            sess = self.sessions.get(sid)
+            if sess and self.session_ttl and time.time() - sess["last_seen"] > self.session_ttl:
+                del self.sessions[sid]  # 模拟会话超时
+                sess = None
+            if sess:
+                sess["last_seen"] = time.time()
+                self.sessions.move_to_end(sid)
+            return sess
+
+    def new_session(self):
+        sid = secrets.token_hex(16).upper()
+        with self.lock:
+            now = time.time()
+            # 清理超时会话（按最近使用排序，遇到第一个未超时的即可停止）
+            while self.session_ttl and self.sessions:
+                oldest = next(iter(self.sessions.values()))
+                if now - oldest["last_seen"] <= self.session_ttl:
+                    break
+                self.sessions.popitem(last=False)
+            while len(self.sessions) >= self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.stats["sessions_evicted"] += 1
+            self.sessions[sid] = {"last_seen": now, "user": None}
+        return sid
+
+    # 计数在多个处理线程中并发更新，读改写与快照都需要持锁，否则会丢失计数
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def snapshot_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockJW/1.0"
+    state: MockState = None
+
+    def log_message(self, fmt, *args):
+        pass  # 压测时不刷屏
+
+    # ---------- 工具 ----------
+    def _session(self):
+        cookie = self.headers.get("Cookie", "")
+        for part in cookie.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "JSESSIONID":
+                sess = self.state.get_session(value)
+                if sess is not None:
+                    return value, sess, False
+        sid = self.state.new_session()
+        return sid, self.state.get_session(sid), True
+
+    def _send(self, status, body=b"", content_type="text/html;charset=UTF-8", headers=None, sid=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if sid:
+            self.send_header("Set-Cookie", f"JSESSIONID={sid}; Path=/; HttpOnly")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate_network(self) -> bool:
+        """注入延迟与错误；返回 False 表示本次请求直接以 500 结束"""
+        delay = self.state.latency + random.uniform(0, self.state.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.state.error_rate and random.random() < self.state.error_rate:
+            self.state.count("injected_errors")
+            self._send(500, b"Internal Server Error", "text/plain")
+            return False
+        return True
+
+    def _read_form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True)
+
+    # ---------- 路由 ----------
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query, keep_blank_values=True)
+        self.state.count(f"{method} {url.path}")
+
+        if url.path == "/__stats":
+            body = json.dumps(self.state.snapshot_stats(), ensure_ascii=False).encode("utf-8")
+            return self._send(200, body, "application/json")
+
+        if not self._simulate_network():
+            return
+
+        sid, sess, is_new = self._session()
+        set_sid = sid if is_new else None
+
+        if method == "GET" and url.path == "/":
+            return self._send(200, self.state.login_page, sid=set_sid)
+
+        if url.path == "/Logon.do" and method == "POST":
+            if query.get("flag") == ["sess"]:
+                return self._handle_sess(sess, set_sid)
+            return self._handle_login(sess, set_sid)
+
+        if method == "GET" and url.path == "/verifycode.servlet":
+            code = self.state.captcha_code or "".join(random.choices(CAPTCHA_CHARSET, k=4))
+            sess["captcha"] = code
+            return self._send(200, render_captcha(code), "image/png", sid=set_sid)
+
+        # 以下页面需要登录
+        if not sess.get("user"):
+            return self._send(200, self.state.login_page, sid=set_sid)
+
+        if method == "GET" and url.path in ("/jsxsd/framework/xsMain.jsp", "/jsxsd/xskb/xskb_list.do"):
+            return self._send(200, "<html><body>学生个人课表</body></html>".encode("utf-8"))
+
+        if method == "GET" and url.path == "/jsxsd/xskb/xskb_print.do":
+            return self._handle_export(query)
+
+        self._send(404, b"Not Found", "text/plain")
+
+    def _handle_sess(self, sess, set_sid):
+        scode = "".join(random.choices(string.ascii_letters + string.digits, k=64))
+        sxh = "".join(random.choices("0123", k=20))
+        sess.update(scode=scode, sxh=sxh)
+        self._send(200, f"{scode}#{sxh}".encode("ascii"), "text/plain", sid=set_sid)
+
+    def _handle_login(self, sess, set_sid):
+        form = self._read_form()
+        username = form.get("userAccount", [""])[0]
+        captcha = form.get("RANDOMCODE", [""])[0]
+        encoded = form.get("encoded", [""])[0]
+        password = self.state.password_for(username)
+
+        captcha_ok = self.state.accept_any_captcha or (
+            sess.get("captcha") and captcha.lower() == sess["captcha"].lower()
+        )
+        encoded_ok = (
+            password is not None and "scode" in sess
+            and encoded == make_encoded(username, password, sess["scode"], sess["sxh"])
+        )
+        sess.pop("captcha", None)  # 验证码只能用一次
+
+        if captcha_ok and encoded_ok:
+            sess["user"] = username
+            self.state.count("logins_ok")
+            return self._send(302, b"", headers={"Location": "/jsxsd/framework/xsMain.jsp"}, sid=set_sid)
+
+        self.state.count("logins_failed")
+        self._send(200, self.state.login_page, sid=set_sid)
+
+    def _handle_export(self, query):
+        zc = query.get("zc", [""])[0]
+        if zc and not zc.isdigit():
+            return self._send(400, b"Bad Request: zc", "text/plain")  # 客户端拼错参数时尽早暴露
+        name = f"courses_week_{int(zc):02}.xls" if zc else "courses_week_all.xls"
+        path = self.state.fixture_dir / name
+        if not path.exists():
+            return self._send(404, b"Not Found", "text/plain")
+        body = path.read_bytes()
+        headers = {}
+        if self.state.conditional:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            headers = {"ETag": etag, "Last-Modified": email.utils.formatdate(path.stat().st_mtime, usegmt=True)}
+            if self.headers.get("If-None-Match") == etag:
+                self.state.count("not_modified")
+                return self._send(304, b"", headers=headers)
+        self.state.count("exports")
+        self._send(200, body, "application/vnd.ms-excel", headers=headers)
+
+
+def make_server(host="127.0.0.1", port=8080, **options) -> ThreadingHTTPServer:
+    state = MockState(**options)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def parse_account(value):
+    username, _, password = value.partition(":")
+    return username, password
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟教务系统")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--account", action="append", type=parse_account, default=[],
+                        help="学号:密码，可重复；不指定时任何学号都可用 --default-password 登录")
+    parser.add_argument("--default-password", default="")
+    parser.add_argument("--captcha-code", help="固定验证码内容（默认每次随机）")
+    parser.add_argument("--accept-any-captcha", action="store_true", help="不校验验证码（压测登录吞吐）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 500 的比例")
+    parser.add_argument("--session-ttl", type=float, default=0, help="会话无操作超时（秒，0 = 不超时）")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="最多保留的会话数")
+    parser.add_argument("--fixtures", default=str(FIXTURE_DIR), help="导出文件目录")
+    parser.add_argument("--no-conditional", action="store_true", help="不返回 ETag / Last-Modified（模拟不支持条件请求的服务器）")
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host, args.port,
+        accounts=dict(args.account),
+        default_password=args.default_password,
+        captcha_code=args.captcha_code,
+        accept_any_captcha=args.accept_any_captcha,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        session_ttl=args.session_ttl,
+        fixture_dir=args.fixtures,
+        conditional=not args.no_conditional,
+        max_sessions=args.max_sessions,
+    )
+    print(f"🧪 模拟教务系统已启动: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
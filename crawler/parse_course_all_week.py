@@ -2,205 +2,154 @@
 # -*- coding: utf-8 -*-
 # 自动登录教务系统并导出 1~21 周课程表
 #
-# 验证码识别策略（最终版）：
-# ✅ 仅使用 ddddocr
-# ✅ 最多尝试 10 次
-# ✅ 识别结果包含 i → 丢弃重新获取
-# ❌ 不使用 Tesseract
-# ❌ 不使用人工输入兜底
-
-import os
+# 验证码默认使用 ddddocr 全自动识别（见 captcha_solvers.py），不需要人工输入
+#
+# 导出策略：
+# ✅ 线程池并发导出（共享登录 Cookie），并发数与每秒请求数可配置
+# ✅ 结果按周次顺序写入
+# ✅ 变化检测：条件请求（ETag / Last-Modified）+ 规范化内容哈希，未变化的周不覆盖文件（见 change_detect.py）
+# ✅ 断点续传：已完成的周记录在状态文件中，登录失效自动重新登录，只补导缺失的周（见 export_job.py）
+
 import time
-import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
 
 import requests
-from PIL import Image  # 仅用于保存调试，无 OCR 处理
-import ddddocr
+from requests.adapters import HTTPAdapter
+from change_detect import ChangeTracker
+from export_job import ExportJob, atomic_write_bytes, is_login_page
+from jw_client import (
+    BASE, CURRENT_TERM, HostRateLimiter,
+    activate_login, fetch_week, get_session, login_fresh, require_credentials,
+)
 
 # ================= CONFIG =================
-BASE = "https://jwyth.hnkjxy.net.cn"
-LOGIN_PAGE = BASE + "/"
-SESS_URL = BASE + "/Logon.do?method=logon&flag=sess"
-LOGIN_POST = BASE + "/Logon.do?method=logon"
-CAPTCHA_URL = BASE + "/verifycode.servlet"
-COURSE_EXPORT_URL = BASE + "/jsxsd/xskb/xskb_print.do"
-
-COMMON_HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/142.0.0.0 Safari/537.36"
-    ),
-    "Accept-Language": "zh-CN,zh;q=0.9",
-    "Connection": "keep-alive",
-}
-
-USERNAME = os.environ.get("JW_USERNAME")
-PASSWORD = os.environ.get("JW_PASSWORD") or ""
-
-if not USERNAME:
-    raise SystemExit("❌ 请设置环境变量 JW_USERNAME / JW_PASSWORD")
-
-# ================= UTIL =================
-def save_text(path: Path, text: str):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(text, encoding="utf-8")
-
-def make_encoded(username, password, scode, sxh):
-    """
-    教务系统特有的密码混淆算法
-    """
-    code = f"{username}%%%{password}"
-    encoded = ""
-    i = 0
-    for ch in code:
-        n = int(sxh[i]) if i < len(sxh) and sxh[i].isdigit() else 0
-        encoded += ch + scode[:n]
-        scode = scode[n:]
-        i += 1
-    return encoded
-
-# ================= OCR CORE（最终收敛版） =================
-print("✅ ddddocr 可用（唯一验证码识别方案）")
-_ocr = ddddocr.DdddOcr(show_ad=False, beta=True)
-
-def recognize_captcha_dddocr(image_path: str) -> str:
+# 登录、验证码与单周请求的配置见 jw_client.py / captcha_solvers.py
+
+# 导出配置
+EXPORT_TERMS = [CURRENT_TERM]           # 需要导出的学期，可填多个
+EXPORT_WEEKS = range(1, 22)
+EXPORT_MAX_WORKERS = 4                  # 同时进行的导出请求数（1 = 串行）
+EXPORT_RATE_LIMIT = 4.0                 # 每秒最多向同一主机发起的请求数（0 = 不限速）
+# "weekly" = 逐周导出 21 个文件；
+# "single" = zc 留空一次导出全部周次（1 次请求），再用 convert_xls_to_json.parse_all_weeks 本地展开
+EXPORT_MODE = "weekly"
+
+
+def parse_week(value, weeks=EXPORT_WEEKS):
     """
-    使用 ddddocr 识别验证码
+    解析用户输入的周次："all" 或空 → ""（导出全部周次）；weeks 范围内的整数 → int
+    其他输入抛出 ValueError
     """
-    try:
-        with open(image_path, "rb") as f:
-            res = _ocr.classification(f.read())
-        res = "".join(c for c in res.lower() if c.isalnum())
-        if len(res) >= 4:
-            print(f"🤖 ddddocr 识别验证码: {res[:4]}")
-            return res[:4]
-        return ""
-    except Exception as e:
-        print(f"🤖 ddddocr 识别异常: {e}")
+    value = str(value).strip()
+    if value.lower() in ("", "all"):
         return ""
+    if not value.isdigit() or int(value) not in weeks:
+        raise ValueError(f"周次应为 {weeks[0]}~{weeks[-1]} 的整数或 all，收到 {value!r}")
+    return int(value)
 
-def is_invalid_captcha(code: str) -> bool:
+# ================= EXPORT =================
+def export_course_xls(session, login_resp=None, terms=None, weeks=EXPORT_WEEKS,
+                      max_workers=EXPORT_MAX_WORKERS, rate_limit=EXPORT_RATE_LIMIT, detect_changes=True,
+                      out_root="extracted_courses", login=None, limiter=None):
     """
-    已知问题：
-    - ddddocr 可能将 l 识别为 i
-    - 实际验证码中不会出现 i
+    并发导出多个学期的周课表：
+    - 所有请求共享同一个 session（同一 Cookie 登录态）
+    - 最多 max_workers 个请求同时进行，并按主机限速 rate_limit 次/秒
+    - 结果按周次顺序原子写入文件，进度记录在状态文件中
+    - 请求异常退避重试；登录失效时重新登录，只补导缺失的周
+    - detect_changes 时内容未变化的周不覆盖文件，并在输出目录写出 .change_report.json
+    login_resp 为 None 表示 session 已激活（例如复用的缓存登录态）
+    login: 重新登录用的函数（默认用 JW_USERNAME 登录）；limiter: 多账号共享的限速器
+    返回仍未导出成功的 [(学期, 周次), ...]
     """
-    return "i" in code
-
-def download_captcha_and_ocr(session, max_retry=10) -> str:
+    if login_resp is not None and not activate_login(session, login_resp):
+        return None
+
+    terms = list(terms or EXPORT_TERMS)
+    weeks = list(weeks)
+    max_workers = max(1, int(max_workers))
+    limiter = limiter or HostRateLimiter(rate_limit)
+    login = login or login_fresh
+
+    def mount(s):
+        # 连接池至少要容纳全部并发请求，否则多出的连接会被直接丢弃
+        s.mount(BASE + "/", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        return s
+
+    def relogin():
+        s = login()
+        return mount(s) if s else None
+
+    def fetcher(term, tracker):
+        def run(s, week):
+            print(f"📤 导出 {term} 第 {week} 周课程表")
+            try:
+                return fetch_week(s, week, term, limiter, tracker), None
+            except requests.RequestException as e:
+                return None, e
+
+        def fetch_many(s, missing):
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                # map 按提交顺序返回结果，保证按周次顺序落盘
+                results = pool.map(lambda week: run(s, week), missing)
+                for week, (content, error) in zip(missing, results):
+                    yield week, content, error
+
+        return fetch_many
+
+    mount(session)
+    failed = []
+    started = time.perf_counter()
+    for term in terms:
+        if session is None:  # 重新登录失败，剩余学期留待下次运行
+            failed += [(term, week) for week in weeks]
+            continue
+        out_dir = Path(out_root)
+        if len(terms) > 1:
+            out_dir = out_dir / term
+        tracker = ChangeTracker(out_dir) if detect_changes else None
+        job = ExportJob(out_dir, term, weeks, fetcher(term, tracker), relogin, tracker=tracker)
+        failed += [(term, week) for week in job.run(session)]
+        session = job.session  # 可能已重新登录
+
+    elapsed = time.perf_counter() - started
+    total = len(terms) * len(weeks)
+    if failed:
+        print(f"⚠️ {total - len(failed)}/{total} 周导出成功，未完成: {failed}（再次运行将从断点继续）")
+    else:
+        print(f"🎉 {weeks[0]}~{weeks[-1]} 周课程导出完成（{total} 周，耗时 {elapsed:.1f}s）")
+    return failed
+
+def export_all_weeks_single(session, login_resp=None, term=None, out_root="extracted_courses"):
     """
-    验证码获取与识别（最终策略）：
-    - 只使用 ddddocr
-    - 含 i → 丢弃
-    - 最多尝试 max_retry 次
+    一次请求导出全部周次（zc 为空），保存为 courses_week_all.xls
     """
-    save_dir = Path(__file__).parent / "captcha_image_library"
-    save_dir.mkdir(exist_ok=True)
-
-    for attempt in range(1, max_retry + 1):
-        r = session.get(
-            CAPTCHA_URL + "?t=" + str(int(time.time() * 1000)),
-            timeout=15
-        )
-        r.raise_for_status()
+    if login_resp is not None and not activate_login(session, login_resp):
+        return None
 
-        img_path = save_dir / f"captcha_{datetime.now():%Y%m%d_%H%M%S_%f}.png"
-        img_path.write_bytes(r.content)
+    term = term or EXPORT_TERMS[0]
+    print(f"📤 导出 {term} 全部周次课程表")
+    content = fetch_week(session, "", term)
 
-        print(f"🖼 验证码已保存 ({attempt}/{max_retry}): {img_path}")
+    out_dir = Path(out_root)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if is_login_page(content):
+        print("❌ 全部周次导出失败（登录失效）")
+        return None
 
-        code = recognize_captcha_dddocr(str(img_path))
-
-        if not code:
-            print("⚠️ ddddocr 未识别出结果，重新获取验证码")
-            continue
-
-        if is_invalid_captcha(code):
-            print(f"♻️ 检测到非法字符 i（疑似 l→i）：{code}，重新获取验证码")
-            continue
-
-        print(f"✅ 使用验证码: {code}")
-        return code
-
-    raise RuntimeError("❌ 连续 10 次验证码识别失败（ddddocr）")
-
-# ================= LOGIN =================
-def login_via_raw_body():
-    s = requests.Session()
-    s.headers.update(COMMON_HEADERS)
-
-    print("Step1: GET 登录页")
-    r1 = s.get(LOGIN_PAGE, timeout=15)
-    save_text(Path("debug/debug_loginpage.html"), r1.text)
-
-    print("Step2: 获取 scode / sxh")
-    r_sess = s.post(SESS_URL, timeout=15)
-    scode, sxh = r_sess.text.strip().split("#", 1)
-
-    captcha = download_captcha_and_ocr(s)
-    encoded = make_encoded(USERNAME, PASSWORD, scode, sxh)
-
-    body = (
-        f"userAccount={USERNAME}"
-        f"&userPassword="
-        f"&RANDOMCODE={urllib.parse.quote_plus(captcha)}"
-        f"&encoded={urllib.parse.quote_plus(encoded)}"
-    )
-
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded",
-        "Origin": BASE,
-        "Referer": LOGIN_PAGE,
-        "User-Agent": COMMON_HEADERS["User-Agent"],
-    }
-
-    print("Step3: 提交登录请求")
-    r_post = s.post(
-        LOGIN_POST,
-        data=body.encode(),
-        headers=headers,
-        allow_redirects=False
-    )
-    return s, r_post
-
-# ================= EXPORT =================
-def export_course_xls(session, login_resp):
-    if "Location" not in login_resp.headers:
-        print("❌ 登录失败")
-        return
-
-    loc = login_resp.headers["Location"]
-    if loc.startswith("/"):
-        loc = BASE + loc
-
-    session.get(loc, timeout=15)
-    out_dir = Path("extracted_courses")
-    out_dir.mkdir(exist_ok=True)
-
-    for week in range(1, 22):
-        print(f"📤 导出第 {week} 周课程表")
-        params = {
-            "xnxq01id": "2025-2026-1",
-            "zc": str(week),
-            "kbjcmsid": "C26030BDC5F8456CBE75B8779AED2F8A",
-            "wkbkc": "1",
-        }
-
-        r = session.get(COURSE_EXPORT_URL, params=params, timeout=20)
-        save_path = out_dir / f"courses_week_{week:02}.xls"
-        save_path.write_bytes(r.content)
-
-        if b"loginForm" in r.content:
-            print(f"❌ 第 {week} 周失败（登录失效）")
-        else:
-            print(f"✅ 第 {week} 周成功: {save_path}")
-
-    print("🎉 1~21 周课程导出完成")
+    save_path = out_dir / "courses_week_all.xls"
+    atomic_write_bytes(save_path, content)
+    print(f"✅ 全部周次导出成功: {save_path}")
+    return save_path
 
 # ================= MAIN =================
 if __name__ == "__main__":
-    session, resp = login_via_raw_body()
-    export_course_xls(session, resp)
+    require_credentials()
+
+    session = get_session()
+    if session:
+        if EXPORT_MODE == "single":
+            export_all_weeks_single(session)
+        else:
+            export_course_xls(session)
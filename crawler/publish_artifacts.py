@@ -0,0 +1,188 @@
+# publish_artifacts.py
+# -*- coding: utf-8 -*-
+# 发布阶段：把 convert_xls_to_json 生成的 JSON 变成适合静态托管长期缓存的文件
+#
+# ✅ 重新序列化为无空白的紧凑 JSON
+# ✅ 文件名带内容哈希（all_weeks_courses.3f2a1b9c0d.json），内容不变文件名就不变
+# ✅ 同时写出 .gz（以及安装了 brotli 时的 .br）预压缩文件，服务器直接发送，无需实时压缩
+# ✅ dist/index.json 记录每个逻辑文件当前对应的哈希文件名，前端先读它再加载数据
+# ✅ 只保留当前与上一次发布引用的哈希文件，正在加载旧 index 的页面不会 404
+#
+# 推荐的缓存策略（以 nginx 为例）：
+#   location ~ "\.[0-9a-f]{10}\.json(\.gz|\.br)?$" { add_header Cache-Control "public, max-age=31536000, immutable"; }
+#   location = /dist/index.json                     { add_header Cache-Control "no-cache"; }
+#   gzip_static on;  brotli_static on;              # 直接发送预压缩文件
+#
+# 用法：
+#   python publish_artifacts.py                 → 发布 ../frontend/dist 下的课表数据
+#   python cli.py convert --publish             → 解析后立即发布
+# 发布过一次之后（dist 下已有 index.json），convert_xls_to_json 每次写出新数据都会自动重新发布
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+from export_job import atomic_write_bytes
+
+DIST_DIR = Path("../frontend/dist")
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+HASH_LENGTH = 10
+
+# 需要发布的逻辑文件（相对 dist 目录）；按周分片由 weeks/manifest.json 引出
+ARTIFACTS = ["all_weeks_courses.json", "all_weeks_courses.compact.json"]
+SHARD_MANIFEST = "weeks/manifest.json"
+
+HASHED_RE = re.compile(r"\.[0-9a-f]{%d}\.json(\.gz|\.br)?$" % HASH_LENGTH)
+
+
+def minify_json(data: bytes) -> bytes:
+    return json.dumps(json.loads(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    """weeks/week_01.json → weeks/week_01.<哈希>.json"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, _, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}"
+
+
+def compress_gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)  # mtime=0：相同内容得到相同字节
+
+
+def compress_brotli(data: bytes):
+    """brotli 是可选依赖，没有安装时返回 None（只发布 .gz）"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+# ================= 发布 =================
+class Publisher:
+    def __init__(self, dist_dir=DIST_DIR):
+        self.dist_dir = Path(dist_dir).resolve()
+        self.files = {}      # 逻辑文件名 → 哈希文件名
+        self.written = 0
+        self.brotli = True
+
+    def publish_bytes(self, name: str, data: bytes, record=True) -> str:
+        """
+        写出哈希文件及其压缩版本（已存在的哈希文件内容必然相同，直接跳过），返回哈希文件名
+        record=False：不记入 index（各周分片由分片清单引用，index 保持很小）
+        """
+        target = hashed_name(name, data)
+        path = self.dist_dir / target
+        if not path.exists():
+            # 先写压缩版本：哈希文件存在就说明 .gz 也已完整写出
+            atomic_write_bytes(path.with_name(path.name + ".gz"), compress_gzip(data))
+            atomic_write_bytes(path, data)
+            self.written += 1
+
+        br_path = path.with_name(path.name + ".br")
+        if self.brotli and not br_path.exists():
+            compressed = compress_brotli(data)
+            if compressed is None:
+                self.brotli = False
+                print("⚠️ 未安装 brotli，只生成 .gz 预压缩文件（pip install brotli）")
+            else:
+                atomic_write_bytes(br_path, compressed)
+
+        if record:
+            self.files[name] = target
+        return target
+
+    def publish_file(self, name: str):
+        src = self.dist_dir / name
+        if not src.exists():
+            print(f"⚠️ 未找到 {src}，跳过")
+            return None
+        return self.publish_bytes(name, minify_json(src.read_bytes()))
+
+    def publish_shards(self):
+        """先发布各周分片，再发布文件名已替换为哈希文件名的清单"""
+        src = self.dist_dir / SHARD_MANIFEST
+        if not src.exists():
+            return None
+
+        manifest = json.loads(src.read_text(encoding="utf-8"))
+        weeks_dir = Path(SHARD_MANIFEST).parent
+        for entry in manifest["weeks"]:
+            data = minify_json((self.dist_dir / weeks_dir / entry["file"]).read_bytes())
+            target = self.publish_bytes((weeks_dir / entry["file"]).as_posix(), data, record=False)
+            entry["file"] = Path(target).name
+            entry["sha256"] = hashlib.sha256(data).hexdigest()
+            entry["size"] = len(data)
+
+        data = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self.publish_bytes(SHARD_MANIFEST, data)
+
+    def referenced(self, index: dict) -> set:
+        """index 引用的全部哈希文件（含压缩版本），路径相对 dist 目录"""
+        names = set(index.get("files", {}).values())
+        manifest_name = index.get("files", {}).get(SHARD_MANIFEST)
+        manifest_path = self.dist_dir / manifest_name if manifest_name else None
+        if manifest_path and manifest_path.exists():
+            weeks_dir = Path(SHARD_MANIFEST).parent
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            names.update((weeks_dir / e["file"]).as_posix() for e in manifest["weeks"])
+        return {n + ext for n in names for ext in ("", ".gz", ".br")}
+
+    def prune(self, keep: set) -> int:
+        removed = 0
+        for path in self.dist_dir.rglob("*"):
+            if path.is_file() and HASHED_RE.search(path.name) and \
+                    path.relative_to(self.dist_dir).as_posix() not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+def load_index(dist_dir=DIST_DIR) -> dict:
+    try:
+        return json.loads((Path(dist_dir) / INDEX_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def publish(dist_dir=DIST_DIR, artifacts=ARTIFACTS):
+    """
+    发布 dist 目录下的课表数据，返回新的 index（{"version", "generated_at", "files": {逻辑名: 哈希文件名}}）
+    内容没有变化时 index.json 也保持不变
+    """
+    publisher = Publisher(dist_dir)
+    previous = load_index(publisher.dist_dir)
+
+    for name in artifacts:
+        publisher.publish_file(name)
+    publisher.publish_shards()
+
+    if not publisher.files:
+        print("❌ 没有可发布的文件，请先运行 convert_xls_to_json.py")
+        return None
+
+    index = {"version": INDEX_VERSION, "generated_at": previous.get("generated_at"), "files": publisher.files}
+    if previous.get("files") != publisher.files:
+        index["generated_at"] = datetime.now().astimezone().isoformat(timespec="seconds")
+        atomic_write_bytes(publisher.dist_dir / INDEX_NAME,
+                           json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    removed = publisher.prune(publisher.referenced(index) | publisher.referenced(previous))
+    print(f"🚀 发布完成：{len(publisher.files)} 个逻辑文件，新写入 {publisher.written} 个，清理旧文件 {removed} 个",
+          publisher.dist_dir / INDEX_NAME)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="发布带内容哈希与预压缩的课表数据")
+    parser.add_argument("--dist", default=str(DIST_DIR), help="前端 dist 目录")
+    args = parser.parse_args()
+
+    if publish(args.dist) is None:
+        raise SystemExit(1)
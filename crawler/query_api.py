@@ -0,0 +1,292 @@
+# query_api.py
+# -*- coding: utf-8 -*-
+# 本地课表查询服务（给机器人、手机快捷指令等使用，不需要下载整份 JSON）
+#
+#   GET /today                          今天的课程
+#   GET /date/2025-10-13                某一天的课程
+#   GET /next[?at=2025-10-13T09:00]     下一节课（默认按当前北京时间；at 不带时区按北京时间，
+#                                       带偏移如 01:00Z 或 09:00%2B08:00 会换算到北京时间）
+#   GET /week/5                         第 5 周的课程
+#   GET /room/1-502[?date=2025-10-13]   某教室某天的课程（默认今天；房间号或完整教室名均可）
+#   GET /health                         数据文件与加载状态
+#
+# ✅ 启动时把数据加载进 CourseStore（列式 + 日期 / 课程 / 教室索引），查询不扫描全表
+# ✅ 每个响应带 ETag（响应体哈希），客户端带 If-None-Match 时返回 304
+# ✅ 相同查询的响应体在内存中缓存，数据版本变化时整体失效
+# ✅ 数据文件修改时间或大小变化时自动重新加载（最多每 RELOAD_CHECK 秒检查一次），无需重启
+#
+# 用法：
+#   python query_api.py --port 8765
+#   python cli.py serve --port 8765
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.parse
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from course_store import CourseStore
+
+COMPACT_PATH = Path("../frontend/dist/all_weeks_courses.compact.json")
+JSON_PATH = Path("../frontend/dist/all_weeks_courses.json")  # 没有紧凑格式时使用
+RELOAD_CHECK = 1.0        # 秒
+RESPONSE_CACHE_SIZE = 512
+
+BEIJING = timezone(timedelta(hours=8))
+TIME_RE = re.compile(r"(\d{1,2}:\d{2})-(\d{1,2}:\d{2})")
+
+
+def now_in_beijing() -> datetime:
+    return datetime.now(BEIJING)
+
+
+def parse_at(value) -> datetime:
+    """?at= 参数 → 北京时间：带时区偏移的时间换算到北京时间，不带时区的按北京时间理解"""
+    at = datetime.fromisoformat(value)
+    return at.astimezone(BEIJING) if at.tzinfo else at.replace(tzinfo=BEIJING)
+
+
+def section_start_end(section):
+    """"第一大节 (01,02小节) 08:20-09:55" → ("08:20", "09:55")；没有时间时返回 (None, None)"""
+    m = TIME_RE.search(section)
+    return (m.group(1).zfill(5), m.group(2).zfill(5)) if m else (None, None)
+
+
+# ================= 数据 =================
+class Snapshot:
+    """
+    某一版本数据的只读快照：CourseStore、索引与版本号一起创建，之后不再修改
+    重新加载时整体替换，处理请求的线程取一次快照后始终读到同一版本
+    """
+
+    def __init__(self, store, version, source):
+        self.store = store
+        self.version = version
+        self.source = source
+        self.loaded_at = datetime.now(BEIJING).isoformat(timespec="seconds")
+
+        self.rooms = {}  # 房间号 / 完整教室名 → {字符串编号}
+        for string_id in store.classroom_index:
+            classroom = store.strings[string_id]
+            self.rooms.setdefault(classroom, set()).add(string_id)
+            if classroom.split():
+                self.rooms.setdefault(classroom.split()[0], set()).add(string_id)
+
+        # 记录按日期排序、各周日期互不重叠，因此每周的行是连续区间
+        self.week_rows = {}  # 周次 → (起始行, 结束行)
+        for row_id, week_id in enumerate(store.columns["week"]):
+            start, _ = self.week_rows.get(store.weeks[week_id], (row_id, row_id))
+            self.week_rows[store.weeks[week_id]] = (start, row_id + 1)
+
+    # ---------------- 查询 ----------------
+    def records(self, rows):
+        """CourseStore 行 → 输出记录（附带开始 / 结束时间）"""
+        out = []
+        for row_id in rows:
+            rec = self.store.record(row_id)
+            rec["start"], rec["end"] = section_start_end(rec["section"])
+            out.append(rec)
+        return out
+
+    def on_date(self, day):
+        return {"date": day, "courses": self.records(self.store.rows_on(day))}
+
+    def week(self, week):
+        week_num = f"{int(week):02}"
+        if week_num not in self.store.weeks:
+            return None
+        return {"week": week_num, "courses": self.records(range(*self.week_rows.get(week_num, (0, 0))))}
+
+    def room(self, room, day):
+        ids = self.rooms.get(room, set())
+        rows = [r for r in self.store.rows_on(day) if self.store.columns["classroom"][r] in ids]
+        return {"room": room, "date": day, "courses": self.records(rows)}
+
+    def next_course(self, at: datetime):
+        today = at.date().isoformat()
+        clock = at.strftime("%H:%M")
+        if not self.store.dates:
+            return {"at": at.isoformat(timespec="minutes"), "course": None}
+        for rec in self.records(self.store.rows_between(today, self.store.dates[-1])):
+            if rec["date"] > today or (rec["start"] and rec["start"] > clock):
+                return {"at": at.isoformat(timespec="minutes"), "course": rec}
+        return {"at": at.isoformat(timespec="minutes"), "course": None}
+
+    def health(self):
+        return {"source": str(self.source), "version": self.version,
+                "loaded_at": self.loaded_at, "courses": len(self.store)}
+
+
+class ScheduleData:
+    """
+    持有当前数据快照；文件变化时在下一次请求中重新加载并整体替换快照
+    重新加载失败（例如文件正在写入）时继续使用旧数据
+    """
+
+    def __init__(self, path=COMPACT_PATH, fallback=JSON_PATH, check_interval=RELOAD_CHECK):
+        self.path = Path(path)
+        self.fallback = Path(fallback) if fallback else None
+        self.check_interval = check_interval
+        self.snapshot = None  # Snapshot，未加载到数据时为 None
+        self.responses = {}   # 查询 → (数据版本, etag, body)
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.reload(force=True)
+
+    def _source(self):
+        for path in (self.path, self.fallback):
+            if path and path.exists():
+                return path
+        return None
+
+    def reload(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            self._checked = now
+            source = self._source()
+            if source is None:
+                return
+            st = source.stat()
+            version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+            current = self.snapshot
+            if current and version == current.version and source == current.source:
+                return
+            try:
+                if source.name.endswith(".compact.json"):
+                    store = CourseStore.load(source)
+                else:
+                    store = CourseStore.from_results(json.loads(source.read_text(encoding="utf-8")))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ 重新加载 {source} 失败，继续使用旧数据: {e}")
+                return
+
+            self.snapshot = Snapshot(store, version, source)  # 一次赋值完成切换
+            self.responses = {}
+            print(f"📚 已加载 {source}（{len(store)} 节课，版本 {version}）")
+
+    def cached(self, snapshot, key, build):
+        """
+        相同数据版本下相同查询只序列化一次
+        缓存项记录生成它的快照版本：旧快照上生成的响应不会被当作新版本的结果返回
+        """
+        responses = self.responses
+        hit = responses.get(key)
+        if hit and hit[0] == snapshot.version:
+            return hit[1], hit[2]
+        data = build()
+        if data is None:
+            return None, None
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if len(responses) >= RESPONSE_CACHE_SIZE:
+            responses = self.responses = {}
+        responses[key] = (snapshot.version, etag, body)
+        return etag, body
+
+
+# ================= HTTP =================
+class QueryHandler(BaseHTTPRequestHandler):
+    server_version = "CourseQuery/1.0"
+    data: ScheduleData = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        if body or status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        self._send(status, body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.data.reload()
+        data = self.data
+        snap = data.snapshot  # 整个请求只使用这一份快照
+        if snap is None:
+            return self._error(503, "课表数据尚未生成，请先运行 convert_xls_to_json.py")
+
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        parts = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/") if p]
+        now = now_in_beijing()
+
+        try:
+            if parts == ["today"]:
+                day = now.date().isoformat()
+                etag, body = data.cached(snap, ("date", day), lambda: snap.on_date(day))
+            elif len(parts) == 2 and parts[0] == "date":
+                day = date.fromisoformat(parts[1]).isoformat()
+                etag, body = data.cached(snap, ("date", day), lambda: snap.on_date(day))
+            elif parts == ["next"]:
+                at = parse_at(query["at"][0]) if "at" in query else now
+                etag, body = data.cached(snap, ("next", at.strftime("%Y-%m-%dT%H:%M")), lambda: snap.next_course(at))
+            elif len(parts) == 2 and parts[0] == "week" and parts[1].isdigit():
+                etag, body = data.cached(snap, ("week", int(parts[1])), lambda: snap.week(parts[1]))
+                if body is None:
+                    return self._error(404, f"没有第 {parts[1]} 周的数据")
+            elif len(parts) == 2 and parts[0] == "room":
+                day = date.fromisoformat(query["date"][0]).isoformat() if "date" in query else now.date().isoformat()
+                etag, body = data.cached(snap, ("room", parts[1], day), lambda: snap.room(parts[1], day))
+            elif parts == ["health"]:
+                etag, body = data.cached(snap, ("health",), snap.health)
+            else:
+                return self._error(404, "未知的接口，可用：/today /date/YYYY-MM-DD /next /week/N /room/X?date=")
+        except ValueError as e:
+            return self._error(400, f"参数错误: {e}")
+
+        headers = {"ETag": etag}
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers=headers)
+        self._send(200, body, headers)
+
+
+def make_server(host="127.0.0.1", port=8765, **options) -> ThreadingHTTPServer:
+    data = ScheduleData(**options)
+    handler = type("BoundQueryHandler", (QueryHandler,), {"data": data})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.data = data
+    return server
+
+
+def serve(host="127.0.0.1", port=8765, **options):
+    server = make_server(host, port, **options)
+    print(f"🔎 课表查询服务已启动: http://{host}:{server.server_port}/today")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地课表查询服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default=str(COMPACT_PATH), help="紧凑课表文件（all_weeks_courses.compact.json）")
+    parser.add_argument("--json", default=str(JSON_PATH), help="紧凑文件不存在时使用的 all_weeks_courses.json")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, path=args.data, fallback=args.json)
@@ -0,0 +1,103 @@
+# session_store.py
+# -*- coding: utf-8 -*-
+# 登录态缓存：
+# ✅ 登录成功后把 JSESSIONID 等 Cookie 保存到本地（带 TTL）
+# ✅ 下次运行先用一次轻量请求验证，仍有效则直接复用
+# ✅ 验证请求返回登录页（loginForm）时才回退到完整登录流程
+
+import json
+import os
+import time
+from pathlib import Path
+
+import requests
+
+# ================= CONFIG =================
+SESSION_DIR = Path(__file__).parent / ".session_cache"
+SESSION_TTL = 20 * 60  # 秒，教务系统会话一般 30 分钟无操作即失效
+
+
+def _session_file(username: str, directory: Path) -> Path:
+    return Path(directory) / f"{username}.json"
+
+
+def save_session(session: requests.Session, username: str, directory: Path = SESSION_DIR):
+    """
+    保存当前 session 的全部 Cookie（先写临时文件再替换，避免并发读到半个文件）
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    data = {
+        "username": username,
+        "saved_at": time.time(),
+        "cookies": [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in session.cookies
+        ],
+    }
+
+    path = _session_file(username, directory)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def clear_session(username: str, directory: Path = SESSION_DIR):
+    _session_file(username, directory).unlink(missing_ok=True)
+
+
+def load_session(username: str, headers=None, ttl=SESSION_TTL, directory: Path = SESSION_DIR):
+    """
+    读取本地缓存的 Cookie 并构造 session；不存在、损坏或超过 TTL 时返回 None
+    """
+    path = _session_file(username, directory)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - data.get("saved_at", 0) > ttl:
+        print("⌛ 缓存的登录态已过期")
+        clear_session(username, directory)
+        return None
+
+    s = requests.Session()
+    if headers:
+        s.headers.update(headers)
+    for c in data.get("cookies", []):
+        s.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+    return s
+
+
+def is_session_alive(session: requests.Session, probe_url: str) -> bool:
+    """
+    用一次请求验证登录态：返回登录页（loginForm）即视为失效
+    """
+    try:
+        r = session.get(probe_url, timeout=10)
+    except requests.RequestException as e:
+        print(f"⚠️ 登录态验证请求失败: {e}")
+        return False
+    return r.ok and b"loginForm" not in r.content
+
+
+def restore_session(username: str, probe_url: str, headers=None, ttl=SESSION_TTL,
+                    directory: Path = SESSION_DIR):
+    """
+    尝试复用缓存的登录态：
+    - 成功：返回可直接使用的 session，并刷新缓存时间
+    - 失败：清除缓存并返回 None，由调用方走完整登录流程
+    """
+    s = load_session(username, headers, ttl, directory)
+    if s is None:
+        return None
+
+    if not is_session_alive(s, probe_url):
+        print("♻️ 缓存的登录态已失效，重新登录")
+        clear_session(username, directory)
+        return None
+
+    save_session(s, username, directory)
+    return s
@@ -1,18 +1,86 @@
+let distIndexPromise = null;
+
+/**
+ * 读取发布清单 dist/index.json（见 crawler/publish_artifacts.py）
+ * 清单很小且每次都向服务器确认；其中的哈希文件内容永不变化，可以长期缓存
+ * @returns {Promise<Object>} { 逻辑文件名: 哈希文件名 }，未发布时返回空对象
+ */
+function loadDistIndex() {
+    if (!distIndexPromise) {
+        distIndexPromise = fetch('./dist/index.json', { cache: 'no-cache' })
+            .then(response => (response.ok ? response.json() : {}))
+            .then(index => (index && index.files) || {})
+            .catch(() => ({}));
+    }
+    return distIndexPromise;
+}
+
+/**
+ * 把逻辑文件名解析为实际地址：已发布时使用带哈希的文件，否则使用原始文件
+ * @param {string} name 相对 dist 的文件名，例如 'weeks/manifest.json'
+ * @returns {Promise<{url: string, hashed: boolean}>}
+ */
+async function resolveDistFile(name) {
+    const files = await loadDistIndex();
+    const hashed = files[name];
+    return { url: `./dist/${hashed || name}`, hashed: Boolean(hashed) };
+}
+
 /**
  * 从 JSON 文件获取课程数据
  * @returns {Promise<Array>} 课程列表
  */
 export async function fetchAllCourses() {
     try {
-        const response = await fetch('./dist/all_weeks_courses.json');
+        const { url } = await resolveDistFile('all_weeks_courses.json');
+        const response = await fetch(url);
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         // 返回的是对象: { "01": [], "02": [...] }
         const data = await response.json();
-        return data; 
+        return data;
     } catch (error) {
         console.error('Failed to fetch courses:', error);
         return {}; // 失败时返回空对象
     }
-}
\ No newline at end of file
+}
+
+/**
+ * 获取按周分片的清单 (dist/weeks/manifest.json)
+ * 未发布时清单文件名固定，每次都向服务器确认是否有更新
+ * @returns {Promise<Object|null>} { version, term_start, weeks: [{ week, start, end, file, sha256, size, count }] }，不存在时返回 null
+ */
+export async function fetchWeekManifest() {
+    try {
+        const { url, hashed } = await resolveDistFile('weeks/manifest.json');
+        const response = await fetch(url, hashed ? {} : { cache: 'no-cache' });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const manifest = await response.json();
+        return manifest && Array.isArray(manifest.weeks) ? manifest : null;
+    } catch (error) {
+        console.warn('Week manifest unavailable, falling back to full JSON:', error);
+        return null;
+    }
+}
+
+/**
+ * 获取单周课程分片
+ * 发布后的清单中 file 已是带哈希的文件名；未发布时在地址后带上内容哈希，内容不变时浏览器可以直接使用缓存
+ * @param {Object} entry manifest.weeks 中的一项
+ * @returns {Promise<Array|null>} 该周课程列表，失败时返回 null
+ */
+export async function fetchWeekShard(entry) {
+    try {
+        const response = await fetch(`./dist/weeks/${entry.file}?v=${entry.sha256.slice(0, 12)}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return await response.json();
+    } catch (error) {
+        console.error(`Failed to fetch week ${entry.week}:`, error);
+        return null;
+    }
+}
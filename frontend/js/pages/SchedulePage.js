@@ -1,4 +1,4 @@
-import { fetchAllCourses } from '../api/fetchCourses.js';
+import { fetchAllCourses, fetchWeekManifest, fetchWeekShard } from '../api/fetchCourses.js';
 import { WeekSelector } from '../components/WeekSelector.js';
 import { ScheduleGrid } from '../components/ScheduleGrid.js';
 import { formatDate } from '../utils/date.js';
@@ -14,6 +14,26 @@ export class SchedulePage {
     }
 
     async init() {
+        // 优先使用按周分片：只下载当前周即可首屏渲染，其余周在后台加载
+        const manifest = await fetchWeekManifest();
+        if (manifest && manifest.weeks.length > 0) {
+            this.weeksData = manifest.weeks.map(entry => ({
+                weekNum: entry.week,
+                startDate: entry.start,
+                endDate: entry.end,
+                days: null,      // 分片加载后才填充
+                entry: entry,
+                loading: null,
+            }));
+
+            this.findCurrentWeek();
+            this.initUI();
+            await this.showWeek(this.currentWeekIdx);
+            this.prefetchWeeks();
+            return;
+        }
+
+        // 没有分片清单（旧版输出）→ 一次性加载全部周
         this.rawCoursesMap = await fetchAllCourses();
         
         // 校验数据
@@ -89,26 +109,59 @@ export class SchedulePage {
             const startDate = formatDate(startCpy);
             const endDate = formatDate(endCpy);
 
-            // 整理当周课程为 Map 格式: { '2025-09-22': [Course, Course] }
-            const daysObj = {};
-            const courses = this.rawCoursesMap[key] || [];
-            
-            courses.forEach(c => {
-                if (!daysObj[c.date]) {
-                    daysObj[c.date] = [];
-                }
-                daysObj[c.date].push(c);
-            });
-
             return {
                 weekNum: key, // "01", "02"
                 startDate: startDate,
                 endDate: endDate,
-                days: daysObj
+                days: groupCoursesByDate(this.rawCoursesMap[key] || [])
             };
         });
     }
 
+    /**
+     * 加载某一周的分片（同一周只请求一次；失败时保留 days 为空，下次切换到该周再重试）
+     * @param {number} idx 周索引
+     */
+    loadWeek(idx) {
+        const week = this.weeksData[idx];
+        if (week.days) return Promise.resolve(true);
+        if (!week.loading) {
+            week.loading = fetchWeekShard(week.entry).then(courses => {
+                week.loading = null;
+                if (!courses) return false;
+                week.days = groupCoursesByDate(courses);
+                return true;
+            });
+        }
+        return week.loading;
+    }
+
+    /**
+     * 切换到某一周：已加载的周立即渲染，未加载的周先显示周次标签与空表格，加载完成后再渲染课程
+     * @param {number} idx 周索引
+     */
+    async showWeek(idx) {
+        this.currentWeekIdx = idx;
+        const pending = this.loadWeek(idx);
+        this.render();
+        if (!this.weeksData[idx].loading) return;
+
+        await pending;
+        if (this.currentWeekIdx === idx) this.render(); // 加载期间用户可能已切换到别的周
+    }
+
+    /**
+     * 首屏渲染后在后台按与当前周的距离依次加载其余周，翻页时通常已经在缓存中
+     */
+    async prefetchWeeks() {
+        const order = this.weeksData
+            .map((_, i) => i)
+            .sort((a, b) => Math.abs(a - this.currentWeekIdx) - Math.abs(b - this.currentWeekIdx));
+        for (const idx of order) {
+            await this.loadWeek(idx);
+        }
+    }
+
     findCurrentWeek() {
         const today = formatDate(new Date());
         // 查找今天是否在某个周的范围内
@@ -132,8 +185,7 @@ export class SchedulePage {
     initUI() {
         const selectorContainer = document.getElementById('week-selector-container');
         this.weekSelector = new WeekSelector(selectorContainer, (newIndex) => {
-            this.currentWeekIdx = newIndex;
-            this.render();
+            this.showWeek(newIndex);
         });
 
         const gridContainer = document.getElementById('schedule-container');
@@ -149,6 +201,25 @@ export class SchedulePage {
         const label = `第 ${Number(currentWeekData.weekNum)} 周 (${currentWeekData.startDate.slice(5)} 起)`;
         
         this.weekSelector.update(this.currentWeekIdx, this.weeksData.length, label);
-        this.scheduleGrid.render(currentWeekData);
+        // 分片加载中先显示该周的空表格（不能留着上一周的课程），加载完成后 showWeek 会重新渲染
+        // 分片加载失败时同样显示空周，切换回该周时会重新请求
+        const ready = currentWeekData.days && !currentWeekData.loading;
+        this.scheduleGrid.render(ready ? currentWeekData : { ...currentWeekData, days: {} });
     }
+}
+
+/**
+ * 整理一周课程为 Map 格式: { '2025-09-22': [Course, Course] }
+ * @param {Array} courses
+ * @returns {Object}
+ */
+function groupCoursesByDate(courses) {
+    const daysObj = {};
+    courses.forEach(c => {
+        if (!daysObj[c.date]) {
+            daysObj[c.date] = [];
+        }
+        daysObj[c.date].push(c);
+    });
+    return daysObj;
 }
\ No newline at end of file
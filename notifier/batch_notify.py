@@ -0,0 +1,319 @@
+# ================================================
+# batch_notify.py
+# 企业微信批量推送：为几百名同学分别推送各自的课表
+# ✅ httpx.AsyncClient 连接池 + 信号量限制并发，所有请求都有超时
+# ✅ 内容相同的收件人合并成一条消息（touser = "a|b|c"，每条最多 1000 人）
+# ✅ 同一文件只上传一次，media_id 与 access_token 复用 wecom_cache 的本地缓存
+# ✅ 频率超限（45009 / 45033）、系统繁忙、HTTP 429 / 5xx 按指数退避 + 抖动重试
+# ✅ 发送消息的请求一旦发出就不再重试（超时 / 5xx / 系统繁忙时可能已送达），
+#    这些收件人在报告中记为 maybe_sent，避免重复推送
+# ✅ 按企业微信返回的 invaliduser 生成逐个收件人的送达报告
+#
+# 收件人文件格式（UTF-8，每行一个收件人，# 开头为注释）：
+#   zhangsan,../crawler/extracted_courses/2024001/courses_week_05.xlsx
+#   lisi,text:明天第一大节调到 1-502
+#
+# 用法：
+#   python batch_notify.py recipients.csv --concurrency 8 --report notify_report.json
+#
+# 依赖 httpx（pip install httpx），只在真正推送时才导入
+# ================================================
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+from config import AGENT_ID
+from send_wecom_file import fetch_token
+from wecom_cache import MEDIA_INVALID_CODES, TOKEN_INVALID_CODES, get_cache, media_key
+
+API = "https://qyapi.weixin.qq.com/cgi-bin"
+CONCURRENCY = 8            # 同时进行的请求数（也是连接池大小）
+MAX_RETRY = 5
+BACKOFF_BASE = 1.0         # 秒
+BACKOFF_MAX = 30.0         # 秒
+TIMEOUT = 15.0             # 秒
+TOUSER_LIMIT = 1000        # 企业微信单条消息 touser 最多 1000 人
+RATE_LIMIT_CODES = {45009, 45033}  # 调用频率超限 / 并发调用超限：请求被拒绝，可以安全重试
+BUSY_CODES = {-1}                  # 系统繁忙：请求可能已经处理
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """指数退避 + 抖动：在 [d/2, d] 之间随机，d = min(cap, base * 2^attempt)"""
+    d = min(cap, base * (2 ** attempt))
+    return random.uniform(d / 2, d)
+
+
+# ================= 收件人 =================
+def load_recipients(path):
+    """返回 [(userid, ("file", 路径) 或 ("text", 内容)), ...]，重复的 userid 只保留第一次出现"""
+    recipients = []
+    seen = set()
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            userid = row[0].strip()
+            content = ",".join(row[1:]).strip()
+            if userid in seen:
+                print(f"⚠️ 收件人 {userid} 重复，已忽略")
+                continue
+            seen.add(userid)
+            if content.startswith("text:"):
+                recipients.append((userid, ("text", content[len("text:"):].strip())))
+            else:
+                recipients.append((userid, ("file", content)))
+    return recipients
+
+
+def group_batches(recipients, limit=TOUSER_LIMIT):
+    """
+    内容相同的收件人合并为一批：文件按文件名 + 内容哈希比较（不同目录下同名且内容相同的文件也会合并）
+    返回 [(message, [userid, ...]), ...]
+    """
+    groups = {}
+    for userid, message in recipients:
+        kind, value = message
+        if kind == "file":
+            try:
+                key = ("file", media_key(value))
+            except OSError:
+                key = ("missing", value)  # 文件不存在：单独成批，发送时报告失败
+        else:
+            key = ("text", value)
+        groups.setdefault(key, (message, []))[1].append(userid)
+
+    batches = []
+    for message, users in groups.values():
+        for i in range(0, len(users), limit):
+            batches.append((message, users[i:i + limit]))
+    return batches
+
+
+# ================= 推送 =================
+class BatchNotifier:
+    def __init__(self, client, concurrency=CONCURRENCY, max_retry=MAX_RETRY):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.max_retry = max_retry
+        self.requests = 0
+        self._token = None
+        self._token_lock = asyncio.Lock()
+        self._uploads = {}   # sha256 → 上传任务，同一文件只上传一次
+
+    async def token(self):
+        async with self._token_lock:
+            if self._token is None:
+                self._token = await asyncio.to_thread(get_cache().get_token, fetch_token)
+            return self._token
+
+    async def drop_token(self, stale):
+        async with self._token_lock:
+            if self._token == stale:  # 其他请求可能已经刷新过
+                get_cache().invalidate_token()
+                self._token = None
+
+    async def backoff(self, attempt):
+        if attempt < self.max_retry:  # 最后一次失败后不再等待
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def call(self, method, path, params=None, retry_after_send=True, **kwargs):
+        """
+        带 access_token 调用接口；token 失效自动刷新，频率超限与网络错误退避重试
+        retry_after_send=False（发送消息）：请求发出后超时、5xx、响应无法解析或系统繁忙时不再重试，
+        返回的结果带 maybe_sent=True，由调用方记录为 "可能已送达"
+        """
+        import httpx
+
+        not_sent = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)  # 请求确定没有发出
+
+        def failed(errmsg):
+            return {"errcode": -2, "errmsg": errmsg}
+
+        data = failed("未发出请求")
+        for attempt in range(self.max_retry + 1):
+            token = await self.token()
+            try:
+                async with self.semaphore:
+                    self.requests += 1
+                    r = await self.client.request(method, API + path,
+                                                  params={"access_token": token, **(params or {})}, **kwargs)
+            except httpx.HTTPError as e:
+                data = failed(f"{type(e).__name__}: {e}")
+                if not retry_after_send and not isinstance(e, not_sent):
+                    return {**data, "maybe_sent": True}
+                await self.backoff(attempt)
+                continue
+
+            if r.status_code == 429:  # 网关限流，请求没有被处理
+                data = failed("HTTP 429")
+                await self.backoff(attempt)
+                continue
+
+            try:
+                data = r.json() if r.status_code < 500 else None  # 代理 / 网关可能返回 200 的 HTML 页面
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                data = failed(f"HTTP {r.status_code}" if r.status_code >= 500 else f"响应不是 JSON: {r.text[:100]!r}")
+                if not retry_after_send:
+                    return {**data, "maybe_sent": True}
+                await self.backoff(attempt)
+                continue
+
+            code = data.get("errcode", 0)
+            if code in TOKEN_INVALID_CODES:
+                await self.drop_token(token)
+                continue
+            if code in BUSY_CODES and not retry_after_send:
+                return {**data, "maybe_sent": True}
+            if code in RATE_LIMIT_CODES or code in BUSY_CODES:
+                print(f"⏳ 接口限流（{code}），第 {attempt + 1}/{self.max_retry + 1} 次请求")
+                await self.backoff(attempt)
+                continue
+            return data
+        return data
+
+    async def media_id(self, filepath, key, refresh=False):
+        if refresh:
+            get_cache().invalidate_media(key)
+            self._uploads.pop(key, None)
+        if key not in self._uploads:
+            self._uploads[key] = asyncio.ensure_future(self._upload(filepath, key))
+        return await self._uploads[key]
+
+    async def _upload(self, filepath, key):
+        media_id = get_cache().get_media(key)
+        if media_id:
+            return media_id
+        content = Path(filepath).read_bytes()
+        data = await self.call("POST", "/media/upload", params={"type": "file"},
+                               files={"media": (os.path.basename(filepath), content, "application/octet-stream")})
+        media_id = data.get("media_id")
+        if media_id:
+            get_cache().put_media(key, media_id, data.get("created_at"))
+        else:
+            print(f"❌ 上传失败 {filepath}: {data}")
+        return media_id
+
+    async def send_batch(self, message, users):
+        """发送一批收件人，返回 [{userid, status, errcode, errmsg}, ...]"""
+        kind, value = message
+        payload = {"touser": "|".join(users), "agentid": AGENT_ID, "safe": 0}
+
+        def report(status, errcode, errmsg):
+            return [{"userid": u, "status": status, "errcode": errcode, "errmsg": errmsg} for u in users]
+
+        if kind == "text":
+            payload.update(msgtype="text", text={"content": value})
+            data = await self.call("POST", "/message/send", retry_after_send=False, json=payload)
+        else:
+            try:
+                key = media_key(value)
+            except OSError as e:
+                return report("failed", -2, f"文件不存在: {e}")
+            data = {}
+            for refresh in (False, True):  # media_id 失效时重新上传一次
+                media_id = await self.media_id(value, key, refresh=refresh)
+                if not media_id:
+                    return report("failed", -2, "文件上传失败")
+                payload.update(msgtype="file", file={"media_id": media_id})
+                data = await self.call("POST", "/message/send", retry_after_send=False, json=payload)
+                if data.get("errcode") not in MEDIA_INVALID_CODES:
+                    break
+
+        code = data.get("errcode", 0)
+        if data.get("maybe_sent"):
+            return report("maybe_sent", code, data.get("errmsg", ""))
+        if code != 0:
+            return report("failed", code, data.get("errmsg", ""))
+
+        invalid = set(filter(None, data.get("invaliduser", "").split("|")))
+        return [
+            {"userid": u, "status": "invalid" if u in invalid else "sent",
+             "errcode": 0, "errmsg": "invaliduser" if u in invalid else "ok"}
+            for u in users
+        ]
+
+
+async def notify_all(recipients, concurrency=CONCURRENCY, max_retry=MAX_RETRY):
+    """推送全部收件人，返回 (逐个收件人的结果, 汇总统计)"""
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("❌ 批量推送需要 httpx：pip install httpx")
+
+    batches = group_batches(recipients)
+    started = time.perf_counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=TIMEOUT) as client:
+        notifier = BatchNotifier(client, concurrency, max_retry)
+        # 单批异常不能中断整个推送，否则已送达的批次也不会出现在报告中
+        reports = await asyncio.gather(*(notifier.send_batch(m, users) for m, users in batches),
+                                       return_exceptions=True)
+        requests_made = notifier.requests
+
+    results = []
+    for (message, users), report in zip(batches, reports):
+        if isinstance(report, BaseException):
+            print(f"❌ 推送异常（{len(users)} 人）: {type(report).__name__}: {report}")
+            report = [{"userid": u, "status": "failed", "errcode": -2, "errmsg": f"{type(report).__name__}: {report}"}
+                      for u in users]
+        results.extend(report)
+    results.sort(key=lambda r: r["userid"])
+    summary = {
+        "recipients": len(results),
+        "sent": sum(r["status"] == "sent" for r in results),
+        "invalid": sum(r["status"] == "invalid" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "maybe_sent": sum(r["status"] == "maybe_sent" for r in results),
+        "batches": len(batches),
+        "requests": requests_made,
+        "elapsed_seconds": time.perf_counter() - started,
+    }
+    return results, summary
+
+
+def print_summary(summary, results):
+    print("=" * 40)
+    print(f"🎉 推送完成：{summary['sent']}/{summary['recipients']} 人送达，"
+          f"{summary['batches']} 条消息，{summary['requests']} 次请求，耗时 {summary['elapsed_seconds']:.1f}s")
+    invalid = [r["userid"] for r in results if r["status"] == "invalid"]
+    failed = [r["userid"] for r in results if r["status"] == "failed"]
+    maybe_sent = [r["userid"] for r in results if r["status"] == "maybe_sent"]
+    if invalid:
+        print(f"⚠️ 无效收件人: {', '.join(invalid)}")
+    if maybe_sent:
+        print(f"❓ 可能已送达（请求已发出但未得到确认，未自动重试）: {', '.join(maybe_sent)}")
+    if failed:
+        print(f"❌ 推送失败: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="企业微信批量推送课表")
+    parser.add_argument("recipients", help="收件人文件（每行 userid,文件路径 或 userid,text:内容）")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="同时进行的请求数")
+    parser.add_argument("--max-retry", type=int, default=MAX_RETRY, help="限流或网络错误时的最大重试次数")
+    parser.add_argument("--report", help="把逐个收件人的送达结果与汇总写入 JSON 文件")
+    args = parser.parse_args()
+
+    recipients = load_recipients(args.recipients)
+    if not recipients:
+        raise SystemExit("❌ 收件人文件中没有收件人")
+    print(f"📂 已加载 {len(recipients)} 个收件人")
+
+    results, summary = asyncio.run(notify_all(recipients, args.concurrency, args.max_retry))
+    print_summary(summary, results)
+
+    if args.report:
+        Path(args.report).write_text(
+            json.dumps({"summary": summary, "recipients": results}, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print("完成：已生成", args.report)
+    if summary["failed"] or summary["maybe_sent"]:
+        raise SystemExit(1)
@@ -21,5 +21,17 @@ COURSE_DIR = r"../crawler/extracted_courses"
 FILE_PREFIX = "courses_week_"
 FILE_EXT = ".xls"
 
+# ⚙️ 解析后的课程数据（摘要模式据此选择周次并生成文字摘要）
+COURSE_JSON = r"../frontend/dist/all_weeks_courses.json"
+
+# ⚙️ 导出变化报告（由爬虫的变化检测生成）
+# 报告存在时只推送有变化且尚未推送过的周（推送成功后确认）；设为 None 则每次都推送
+CHANGE_REPORT = COURSE_DIR + r"/.change_report.json"
+
+# ⚙️ access_token / media_id 本地缓存（见 wecom_cache.py）
+CACHE_FILE = ".wecom_cache.json"
+TOKEN_REFRESH_AHEAD = 5 * 60            # 秒，token 到期前 5 分钟就重新获取
+MEDIA_TTL = 3 * 24 * 3600 - 3600        # 秒，临时素材 3 天有效，提前 1 小时视为过期
+
 # ⚙️ 日志文件输出路径
 LOG_FILE = "wecom_notifier.log"
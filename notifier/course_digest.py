@@ -0,0 +1,150 @@
+# ================================================
+# course_digest.py
+# 课表摘要：从爬虫解析出的 all_weeks_courses.json 生成一周或一天的文字摘要
+# ✅ 按今天的日期自动选择周次（不在学期内时选最近的有课周）
+# ✅ 只保留 时间 / 课程 / 教室，整周摘要通常只有几百字节，直接作为文本消息发送
+# ✅ 自动检测最新周次的课表文件（文件推送模式使用）
+# ================================================
+
+import json
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from config import COURSE_DIR, COURSE_JSON, FILE_EXT, FILE_PREFIX
+
+WEEKDAY_NAMES = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+MESSAGE_LIMIT = 2048  # 企业微信文本 / markdown 消息内容最长 2048 字节
+
+TIME_RE = re.compile(r"(\d{1,2}:\d{2})-(\d{1,2}:\d{2})")
+SECTION_NAME_RE = re.compile(r"第.大节")
+
+
+def today_in_beijing() -> date:
+    return datetime.now(timezone(timedelta(hours=8))).date()
+
+
+def load_courses(path=COURSE_JSON):
+    """读取 {"01": [{weekday, date, section, name, classroom}, ...], ...}"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ---------------- 选择周次 ----------------
+def pick_week(courses, today=None):
+    """
+    返回今天所在的周次（"05"）：
+    - 今天落在某一周（该周周一到周日）内 → 该周
+    - 否则选今天之后最近的有课周；学期已结束则选最后一个有课周
+    没有任何课程时返回 None
+    """
+    today = (today or today_in_beijing()).isoformat()
+    weeks = []  # (周一, 周日, 周次)
+    for week_num, items in courses.items():
+        if not items:
+            continue
+        first = date.fromisoformat(min(c["date"] for c in items))
+        monday = first - timedelta(days=first.weekday())
+        weeks.append((monday.isoformat(), (monday + timedelta(days=6)).isoformat(), week_num))
+    if not weeks:
+        return None
+
+    weeks.sort()
+    for monday, sunday, week_num in weeks:
+        if today <= sunday:
+            return week_num  # 今天所在周，或今天之后最近的有课周
+    return weeks[-1][2]
+
+
+def find_week_file(week_num, directory=COURSE_DIR):
+    """
+    某一周的课表文件：优先使用转换后适合手机查看的 xlsx，其次是原始导出（FILE_EXT）
+    week_num 为 None 时返回周次最大的文件；找不到时返回 None
+    """
+    pattern = re.compile(re.escape(FILE_PREFIX) + r"(\d+)(\.xlsx|" + re.escape(FILE_EXT) + r")$")
+    found = {}  # 周次 → {扩展名: 路径}
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return None
+    for name in names:
+        m = pattern.match(name)
+        if m:
+            found.setdefault(int(m.group(1)), {})[m.group(2)] = os.path.join(directory, name)
+    if not found:
+        return None
+
+    week = int(week_num) if week_num is not None else max(found)
+    files = found.get(week, {})
+    return files.get(".xlsx") or files.get(FILE_EXT)
+
+
+# ---------------- 渲染 ----------------
+def weekday_name(day):
+    return WEEKDAY_NAMES[date.fromisoformat(day).weekday()]
+
+
+def short_section(section):
+    """"第一大节 (01,02小节) 08:20-09:55" → "08:20-09:55"；没有时间时保留 "第一大节" """
+    m = TIME_RE.search(section)
+    if m:
+        return f"{m.group(1).zfill(5)}-{m.group(2).zfill(5)}"
+    m = SECTION_NAME_RE.search(section)
+    return m.group(0) if m else section.strip()
+
+
+def short_classroom(classroom):
+    """"1-502 信息检索沟通与演讲实训室" → "1-502"（房间号后面的名称只占篇幅）"""
+    return classroom.split()[0] if classroom and classroom.split() else classroom
+
+
+def render_digest(courses, week_num, day=None, markdown=False):
+    """
+    渲染某一周（或其中某一天 day="2025-10-13"）的摘要文本
+    markdown=True 时使用企业微信 markdown 消息的加粗与灰色注释
+    """
+    items = courses.get(week_num, [])
+    if day:
+        items = [c for c in items if c["date"] == day]
+    items = sorted(items, key=lambda c: (c["date"], short_section(c["section"])))
+
+    title = f"📅 第 {int(week_num)} 周课表"
+    if day:
+        title = f"📅 {day[5:]} {weekday_name(day)}课表"
+    elif items:
+        title += f"（{items[0]['date'][5:]} ~ {items[-1]['date'][5:]}）"
+    lines = [f"**{title}**" if markdown else title]
+
+    if not items:
+        lines.append("没有课程 🎉")
+        return "\n".join(lines)
+
+    current = None
+    for c in items:
+        if c["date"] != current and not day:
+            current = c["date"]
+            header = f"{weekday_name(current)} {current[5:]}"
+            lines.append(f"**{header}**" if markdown else header)
+        room = short_classroom(c["classroom"])
+        if markdown:
+            lines.append(f"> {short_section(c['section'])} {c['name']} <font color=\"comment\">@{room}</font>")
+        else:
+            lines.append(f"  {short_section(c['section'])} {c['name']} @{room}")
+
+    return truncate("\n".join(lines))
+
+
+def truncate(text, limit=MESSAGE_LIMIT):
+    """超过消息长度上限时按行截断（按 UTF-8 字节计算）"""
+    if len(text.encode("utf-8")) <= limit:
+        return text
+    suffix = "\n……（内容过长，已截断）"
+    budget = limit - len(suffix.encode("utf-8"))
+    kept = []
+    for line in text.split("\n"):
+        size = len(line.encode("utf-8")) + 1
+        if size > budget:
+            break
+        kept.append(line)
+        budget -= size
+    return "\n".join(kept) + suffix
@@ -1,24 +1,48 @@
+import argparse
 import requests
 import json
 import os
-from config import CORP_ID, CORP_SECRET, AGENT_ID, TO_USER
+import re
+import time
+from datetime import date, timedelta
+from config import CORP_ID, CORP_SECRET, AGENT_ID, TO_USER, CHANGE_REPORT
+from course_digest import find_week_file, load_courses, pick_week, render_digest, today_in_beijing
+from wecom_cache import MEDIA_INVALID_CODES, TOKEN_INVALID_CODES, get_cache, media_key
 
+HTTP = requests.Session()  # 复用连接
+TIMEOUT = 15               # 秒
 
-# 1. 获取 access_token
-def get_token():
+
+# 1. 获取 access_token（本地缓存 2 小时，到期前提前刷新）
+def fetch_token():
     url = f"https://qyapi.weixin.qq.com/cgi-bin/gettoken?corpid={CORP_ID}&corpsecret={CORP_SECRET}"
-    data = requests.get(url).json()
-    return data["access_token"]
+    return HTTP.get(url, timeout=TIMEOUT).json()
+
+
+def get_token():
+    return get_cache().get_token(fetch_token)
 
 
-# 2. 通过企业微信上传文件，获得 media_id
+# 2. 通过企业微信上传文件，获得 media_id（同一内容 3 天内直接复用）
 def upload_file(filepath, token):
+    key = media_key(filepath)
+    media_id = get_cache().get_media(key)
+    if media_id:
+        print("♻️ 该文件近期已上传，复用 media_id")
+        return media_id
+
     url = f"https://qyapi.weixin.qq.com/cgi-bin/media/upload?access_token={token}&type=file"
     with open(filepath, "rb") as f:
         files = {"media": (os.path.basename(filepath), f, "application/octet-stream")}
-        res = requests.post(url, files=files).json()
+        res = HTTP.post(url, files=files, timeout=TIMEOUT).json()
     print("上传结果:", res)
-    return res.get("media_id")
+
+    if res.get("errcode") in TOKEN_INVALID_CODES:
+        get_cache().invalidate_token()
+    media_id = res.get("media_id")
+    if media_id:
+        get_cache().put_media(key, media_id, res.get("created_at"))
+    return media_id
 
 
 # 3. 发送文件消息
@@ -31,23 +55,218 @@ def send_file(media_id, token):
         "file": {"media_id": media_id},
         "safe": 0
     }
-    res = requests.post(url, json=data).json()
+    res = HTTP.post(url, json=data, timeout=TIMEOUT).json()
     print("发送结果:", res)
+    return res
 
 
-if __name__ == "__main__":
-    # 你本地生成的课程表文件路径（请改成你真实的）
-    filepath = r"./..//crawler//extracted_courses//courses_week_11.xlsx"
+# 3.1 发送文本 / markdown 消息（摘要模式，不需要上传文件）
+def send_text(content, token, markdown=False):
+    msgtype = "markdown" if markdown else "text"
+    data = {
+        "touser": TO_USER,
+        "msgtype": msgtype,
+        "agentid": AGENT_ID,
+        msgtype: {"content": content},
+        "safe": 0
+    }
+    for attempt in range(2):
+        url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={token}"
+        res = HTTP.post(url, json=data, timeout=TIMEOUT).json()
+        print("发送结果:", res)
+        if attempt or res.get("errcode") not in TOKEN_INVALID_CODES:
+            break
+        print("♻️ access_token 已失效，重新获取后重试")
+        get_cache().invalidate_token()
+        token = get_token()
+    return res
+
+
+def deliver_file(filepath):
+    """
+    获取 token → 上传（或复用 media_id）→ 发送
+    缓存的 token 或 media_id 被企业微信判定失效时清除对应缓存，重新获取后再试一次
+    """
+    for attempt in range(2):
+        token = get_token()
+        media_id = upload_file(filepath, token)
+        if not media_id:
+            if attempt == 0:
+                continue  # 可能是缓存的 token 已失效，已清除缓存
+            raise SystemExit("❌ 文件上传失败，无法发送。")
+
+        res = send_file(media_id, token)
+        code = res.get("errcode")
+        if code in TOKEN_INVALID_CODES:
+            print("♻️ access_token 已失效，重新获取后重试")
+            get_cache().invalidate_token()
+        elif code in MEDIA_INVALID_CODES:
+            print("♻️ media_id 已失效，重新上传后重试")
+            get_cache().invalidate_media(media_key(filepath))
+        else:
+            return res
+    return res
+
+
+# 4. 根据爬虫的变化报告判断该周是否需要推送
+# 报告的 pending.notify 记录尚未推送的变化周：每次导出只会追加，推送成功后才在这里确认清除，
+# 两次推送之间有多次导出时变化也不会丢失（锁文件协议与 crawler/change_detect.py 相同）
+def week_from_file(filepath):
+    m = re.search(r"_(\d+)\.\w+$", os.path.basename(filepath))
+    return m.group(1) if m else None
+
+
+def week_changed(filepath):
+    """没有报告或无法识别周次时按"有变化"处理，宁可多推一次"""
+    week_num = week_from_file(filepath)
+    return week_num is None or week_num_changed(week_num)
+
 
-    print("正在获取 access_token...")
-    token = get_token()
+def load_report():
+    try:
+        with open(CHANGE_REPORT, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError, TypeError):
+        return None
 
-    print("正在上传文件到企业微信...")
-    media_id = upload_file(filepath, token)
-    if not media_id:
-        raise SystemExit("❌ 文件上传失败，无法发送。")
 
-    print("正在发送文件消息...")
-    send_file(media_id, token)
+def week_num_changed(week_num):
+    report = load_report() if CHANGE_REPORT else None
+    if report is None:
+        return True
+    if "pending" not in report:  # 旧格式报告：只有最近一次导出的结果
+        return report.get("weeks", {}).get(str(int(week_num))) != "unchanged"
+    return str(int(week_num)) in report["pending"].get("notify", [])
 
+
+def ack_week(week_num, timeout=10.0, stale=30.0):
+    """推送成功后从报告的 pending.notify 中清除该周"""
+    if not CHANGE_REPORT or week_num is None:
+        return
+    lock = CHANGE_REPORT + ".lock"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > stale:
+                    os.remove(lock)  # 持锁进程已退出
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                print("⚠️ 等待变化报告锁超时，下次运行可能重复推送该周")
+                return
+            time.sleep(0.05)
+        except OSError:
+            return  # 报告目录不存在
+    try:
+        report = load_report()
+        week = str(int(week_num))
+        if not report or week not in report.get("pending", {}).get("notify", []):
+            return
+        report["pending"]["notify"].remove(week)
+        tmp = CHANGE_REPORT + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, CHANGE_REPORT)
+    finally:
+        os.remove(lock)
+
+
+def parse_day(value):
+    """argparse 类型：today / tomorrow / 2025-10-13 → date"""
+    if value == "today":
+        return today_in_beijing()
+    if value == "tomorrow":
+        return today_in_beijing() + timedelta(days=1)
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的日期 {value!r}，应为 today / tomorrow / YYYY-MM-DD")
+
+
+def parse_week(value):
+    """argparse 类型：正整数周次"""
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"无效的周次 {value!r}，应为正整数")
+    return int(value)
+
+
+def pick_target(args):
+    """返回 (课程数据或 None, 周次或 None, 日期或 None)；周次优先取命令行，其次按今天的日期从课程数据中选择"""
+    day = args.day  # 已由 parse_day 转换为 date
+    try:
+        courses = load_courses()
+    except (OSError, ValueError) as e:
+        if args.mode == "digest":
+            raise SystemExit(f"❌ 无法读取课程数据（请先运行爬虫的 convert）: {e}")
+        courses = None
+
+    if args.week is not None:
+        week_num = f"{args.week:02}"
+    elif courses:
+        week_num = pick_week(courses, day)
+    else:
+        week_num = None
+    return courses, week_num, day.isoformat() if day else None
+
+
+def send_digest(args, courses, week_num, day):
+    if not week_num:
+        raise SystemExit("❌ 课程数据中没有任何课程，无法生成摘要。")
+    if not args.force and not day and not week_num_changed(week_num):
+        raise SystemExit(f"⏸ 第 {int(week_num)} 周课表与上次导出相比没有变化，跳过推送。")
+
+    content = render_digest(courses, week_num, day=day, markdown=args.markdown)
+    print(content)
+    print(f"\n正在发送摘要（{len(content.encode('utf-8'))} 字节）...")
+    res = send_text(content, get_token(), markdown=args.markdown)
+    if res.get("errcode"):
+        raise SystemExit(f"❌ 发送失败: {res.get('errmsg')}")
+    if not day:
+        ack_week(week_num)
+    print("\n🎉 完成！请打开【微信 → 企业微信互通应用】查收摘要。")
+
+
+def send_week_file(args, week_num):
+    filepath = args.file or find_week_file(week_num)
+    if not filepath and args.week is None:
+        filepath = find_week_file(None)  # 当前周没有导出文件时退回到最新周次的文件
+    if not filepath:
+        raise SystemExit("❌ 没有找到课表文件，请先运行爬虫导出。")
+    print("📄 推送文件:", filepath)
+
+    if not args.force and not week_changed(filepath):
+        raise SystemExit("⏸ 该周课表与上次导出相比没有变化，跳过推送。")
+
+    print("正在上传并发送文件到企业微信...")
+    res = deliver_file(filepath)
+    if res.get("errcode"):
+        raise SystemExit(f"❌ 发送失败: {res.get('errmsg')}")
+    ack_week(week_from_file(filepath))
     print("\n🎉 完成！请打开【微信 → 企业微信互通应用】查收文件。")
+
+
+if __name__ == "__main__":
+    # python send_wecom_file.py                         → 推送当前周课表文件（自动检测）
+    # python send_wecom_file.py --mode digest           → 推送当前周的文字摘要，不上传文件
+    # python send_wecom_file.py --mode digest --day tomorrow --markdown
+    parser = argparse.ArgumentParser(description="通过企业微信推送课表")
+    parser.add_argument("--mode", choices=["file", "digest"], default="file",
+                        help="file = 上传并推送课表文件；digest = 推送文字摘要")
+    parser.add_argument("--week", type=parse_week, help="周次（默认按今天的日期自动选择）")
+    parser.add_argument("--day", type=parse_day, help="摘要只包含某一天：today / tomorrow / 2025-10-13")
+    parser.add_argument("--markdown", action="store_true", help="摘要以 markdown 消息发送（仅企业微信内可见格式）")
+    parser.add_argument("--file", help="直接指定要推送的文件（file 模式）")
+    parser.add_argument("--force", action="store_true", help="忽略变化报告，总是推送")
+    args = parser.parse_args()
+
+    courses, week_num, day = pick_target(args)
+
+    if args.mode == "digest":
+        send_digest(args, courses, week_num, day)
+    else:
+        send_week_file(args, week_num)
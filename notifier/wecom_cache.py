@@ -0,0 +1,117 @@
+# ================================================
+# wecom_cache.py
+# 企业微信 access_token / media_id 本地缓存
+# ✅ access_token 有效期 2 小时：缓存到本地，到期前 TOKEN_REFRESH_AHEAD 秒提前刷新
+# ✅ 临时素材有效期 3 天：按文件名 + 内容 sha256 缓存 media_id，同一文件重复推送不再上传
+#    （素材带着上传时的文件名，内容相同但文件名不同的文件要分别上传，收件人才能看到正确的文件名）
+# ✅ 接口返回 token 失效（40014 / 42001）或 media_id 失效（40007）时由调用方清除对应缓存
+# ================================================
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from config import CACHE_FILE, MEDIA_TTL, TOKEN_REFRESH_AHEAD
+
+TOKEN_INVALID_CODES = {40014, 42001}   # 不合法 / 已过期的 access_token
+MEDIA_INVALID_CODES = {40007}          # 不合法的 media_id（素材已过期）
+
+
+def file_sha256(filepath) -> str:
+    return hashlib.sha256(Path(filepath).read_bytes()).hexdigest()
+
+
+def media_key(filepath) -> str:
+    """media_id 缓存键：文件名 + 内容 sha256（企业微信按上传时的文件名展示素材）"""
+    return f"{Path(filepath).name}:{file_sha256(filepath)}"
+
+
+class WeComCache:
+    def __init__(self, path=CACHE_FILE, refresh_ahead=TOKEN_REFRESH_AHEAD, media_ttl=MEDIA_TTL):
+        self.path = Path(path)
+        self.refresh_ahead = refresh_ahead
+        self.media_ttl = media_ttl
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    # ---------------- 持久化 ----------------
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"token": None, "media": {}}
+        data.setdefault("token", None)
+        data.setdefault("media", {})
+        return data
+
+    def _save(self):
+        """先写临时文件再替换；文件中有 access_token，只允许当前用户读写"""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self._data, ensure_ascii=False), encoding="utf-8")
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, self.path)
+
+    # ---------------- access_token ----------------
+    def get_token(self, fetch):
+        """
+        fetch() 返回企业微信 gettoken 接口的 JSON（含 access_token、expires_in）
+        缓存的 token 距离过期还有 refresh_ahead 秒以上时直接使用，否则调用 fetch 重新获取
+        """
+        with self._lock:
+            token = self._data["token"]
+            if token and time.time() < token["expires_at"] - self.refresh_ahead:
+                return token["value"]
+
+            data = fetch()
+            if not data.get("access_token"):
+                raise RuntimeError(f"获取 access_token 失败: {data}")
+            self._data["token"] = {
+                "value": data["access_token"],
+                "expires_at": time.time() + int(data.get("expires_in", 7200)),
+            }
+            self._save()
+            return data["access_token"]
+
+    def invalidate_token(self):
+        with self._lock:
+            if self._data["token"]:
+                self._data["token"] = None
+                self._save()
+
+    # ---------------- media_id ----------------
+    def get_media(self, key):
+        """返回仍在有效期内的 media_id，没有时返回 None"""
+        with self._lock:
+            media = self._data["media"].get(key)
+            if media and time.time() < media["created_at"] + self.media_ttl:
+                return media["media_id"]
+            return None
+
+    def put_media(self, key, media_id, created_at=None):
+        with self._lock:
+            now = time.time()
+            # 顺便清理已过期的记录，缓存文件不会无限增长
+            self._data["media"] = {
+                k: v for k, v in self._data["media"].items() if now < v["created_at"] + self.media_ttl
+            }
+            self._data["media"][key] = {"media_id": media_id, "created_at": float(created_at or now)}
+            self._save()
+
+    def invalidate_media(self, key):
+        with self._lock:
+            if self._data["media"].pop(key, None):
+                self._save()
+
+
+_cache = None
+
+
+def get_cache():
+    """进程内共享同一个缓存对象"""
+    global _cache
+    if _cache is None:
+        _cache = WeComCache()
+    return _cache